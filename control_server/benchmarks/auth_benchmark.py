@@ -0,0 +1,73 @@
+"""Measure the authentication overhead of each request, with and without the token cache.
+
+Run from the control_server directory:
+
+    python benchmarks/auth_benchmark.py --users 200
+"""
+
+# Standard imports
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Constellation imports
+import config as c_config
+import constellation_tools as c_tools
+import constellation_users as c_users
+
+
+def report(name: str, func, number: int, baseline: float | None = None) -> float:
+    """Time func and print the mean time per call."""
+
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    line = f"{name:<40} {seconds * 1e6:8.1f} µs"
+    if baseline is not None:
+        line += f"  ({baseline / seconds:.1f}x)"
+    print(line)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-request cost of checking a user's permission.")
+    parser.add_argument("--users", type=int, default=100, help="Number of user accounts")
+    parser.add_argument("--number", type=int, default=2000, help="Calls per timing run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_path:
+        c_config.APP_PATH = app_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            c_tools.check_file_structure()
+        c_users.create_root_admin("benchmark")
+
+        for i in range(args.users):
+            c_users.create_user(f"user{i}", f"User {i}", "password",
+                                permissions={"components": {"edit": [], "edit_content": [], "view": ["__all"]},
+                                             "schedule": "view"})
+        user = c_users.get_user(username=f"user{args.users - 1}")
+        token = c_users.encrypt_token(user.uuid)
+        admin_token = c_users.encrypt_token("admin")
+        print(f"{args.users} users\n")
+
+        def uncached(token_):
+            c_users.clear_token_cache()
+            return c_users.check_user_permission("schedule", "view", token=token_)
+
+        baseline = report("check_user_permission, no cache", lambda: uncached(token), args.number)
+        report("check_user_permission, cached", lambda: c_users.check_user_permission("schedule", "view", token=token),
+               args.number, baseline)
+
+        baseline = report("admin check_user_permission, no cache", lambda: uncached(admin_token), args.number)
+        report("admin check_user_permission, cached",
+               lambda: c_users.check_user_permission("schedule", "view", token=admin_token), args.number, baseline)
+
+        c_users.shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Simulate a fleet of Constellation Apps and web consoles against a local Control Server.
+
+The server runs in a subprocess with a temporary APP_PATH, so existing components, exhibits and
+settings are not touched.
+Each simulated app pings /system/ping on a fixed interval, while the simulated web consoles hold
+/system/updateStream open. A probe component changes its platform_details once per second, which
+lets us measure how long each change takes to reach every subscriber.
+
+Requires httpx. Run from the control_server directory:
+
+    python benchmarks/fleet_simulator.py --clients 500 --subscribers 20 --duration 30
+"""
+
+# Standard imports
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+# Non-standard imports
+import httpx
+import psutil
+
+CONTROL_SERVER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(app_path: str, port: int):
+    """Configure a fresh Control Server in app_path and run it. This is the subprocess entry point."""
+
+    sys.path.insert(0, CONTROL_SERVER_PATH)
+    import uvicorn
+
+    # The Constellation modules set up logging to control_server.log in the code directory when
+    # imported, unless logging is already configured
+    logging.basicConfig(datefmt='%Y-%m-%d %H:%M:%S',
+                        filename=os.path.join(app_path, "control_server.log"),
+                        format='%(levelname)s, %(asctime)s, %(message)s',
+                        level=logging.DEBUG)
+
+    import config as c_config
+    import constellation_exhibit as c_exhibit
+    import constellation_group as c_group
+    import constellation_tools as c_tools
+    import constellation_users as c_users
+    import control_server
+
+    # Importing control_server points APP_PATH at the code directory
+    c_config.APP_PATH = app_path
+    with contextlib.redirect_stdout(io.StringIO()):
+        c_tools.check_file_structure()
+    c_tools.write_json([], c_tools.get_path(["exhibits", "Default.json"], user_file=True))
+    c_tools.write_json({"current_exhibit": "Default",
+                        "gallery_name": "Fleet simulator",
+                        "ip_address": "127.0.0.1",
+                        "port": port},
+                       c_tools.get_path(["configuration", "system.json"], user_file=True))
+    c_users.create_root_admin("fleet-simulator")
+
+    c_exhibit.check_available_exhibits()
+    control_server.load_default_configuration()
+    c_users.load_users()
+    c_group.load_groups()
+    c_exhibit.load_components()
+
+    uvicorn.run(control_server.app, host="127.0.0.1", port=port, log_level="warning", workers=1)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value at the given fraction of the sorted list, or NaN for an empty list."""
+
+    if len(values) == 0:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Results:
+    """Measurements collected during a run."""
+
+    def __init__(self):
+        self.ping_latencies: list[float] = []
+        self.ping_errors: int = 0
+        self.sse_events: int = 0
+        self.sse_bytes: int = 0
+        self.sse_lags: list[float] = []
+        self.probe_sent: dict[int, float] = {}  # Probe sequence number: time sent
+        self.max_threads: int = 0
+        self.max_rss: int = 0
+
+
+def make_ping(component_id: str, uuid_str: str, index: int) -> dict:
+    """Return a ping payload like the ones sent by Constellation Apps."""
+
+    return {
+        "id": component_id,
+        "uuid": uuid_str,
+        "helperAddress": f"http://10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}:8000",
+        "constellation_app_id": random.choice(["media_player", "infostation", "timelapse_viewer"]),
+        "currentInteraction": random.random() < 0.1,
+        "platform_details": {"operating_system": "Windows 11", "browser": "Chrome 118"},
+        "permissions": {"audio": True, "refresh": True, "restart": True, "shutdown": False}
+    }
+
+
+async def simulate_app(client: httpx.AsyncClient, index: int, interval: float, stop_time: float,
+                       results: Results):
+    """Ping the server every interval seconds until stop_time."""
+
+    component_id = f"Sim app {index}"
+    uuid_str = str(uuid.uuid4())
+
+    # Spread the clients evenly across the interval
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.monotonic() < stop_time:
+        start = time.monotonic()
+        try:
+            response = await client.post("/system/ping", json=make_ping(component_id, uuid_str, index))
+            response.raise_for_status()
+            results.ping_latencies.append(time.monotonic() - start)
+        except httpx.HTTPError:
+            results.ping_errors += 1
+        await asyncio.sleep(max(0., interval - (time.monotonic() - start)))
+
+
+async def run_probe(client: httpx.AsyncClient, stop_time: float, results: Results):
+    """Change the probe component once per second so that subscribers can measure fan-out lag."""
+
+    uuid_str = "fleet-simulator-probe"
+    seq = 0
+    while time.monotonic() < stop_time:
+        seq += 1
+        payload = {"id": "Probe", "uuid": uuid_str, "platform_details": {"probe": seq}}
+        results.probe_sent[seq] = time.monotonic()
+        try:
+            await client.post("/system/ping", json=payload)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(1)
+
+
+def find_probe_values(event: str, data: dict) -> list[int]:
+    """Return the probe sequence numbers contained in an update stream event."""
+
+    values = []
+    if event == "update":
+        for component in data.get("components", []):
+            if component["uuid"] == "fleet-simulator-probe":
+                values.append(component["platform_details"].get("probe"))
+    elif event == "delta":
+        for operation in data.get("components_patch", []):
+            if operation["path"].startswith("/fleet-simulator-probe") and "value" in operation:
+                value = operation["value"]
+                if operation["path"].endswith("/platform_details"):
+                    values.append(value.get("probe"))
+                elif isinstance(value, dict) and "platform_details" in value:
+                    values.append(value["platform_details"].get("probe"))
+    return [x for x in values if x is not None]
+
+
+async def subscribe(base_url: str, stop_time: float, results: Results):
+    """Hold an update stream open until stop_time and record the lag of each probe change."""
+
+    with contextlib.suppress(asyncio.TimeoutError, httpx.HTTPError):
+        await asyncio.wait_for(read_update_stream(base_url, results), stop_time - time.monotonic())
+
+
+async def read_update_stream(base_url: str, results: Results):
+    """Read events from the update stream until cancelled."""
+
+    seen = set()
+    timeout = httpx.Timeout(10, read=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        async with client.stream("GET", "/system/updateStream") as response:
+            event = ""
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    received = time.monotonic()
+                    results.sse_events += 1
+                    results.sse_bytes += len(line)
+                    for seq in find_probe_values(event, json.loads(line[5:])):
+                        if seq in results.probe_sent and seq not in seen:
+                            seen.add(seq)
+                            results.sse_lags.append(received - results.probe_sent[seq])
+
+
+async def sample_server(pid: int, stop_time: float, results: Results):
+    """Record the peak thread count and memory use of the server process."""
+
+    process = psutil.Process(pid)
+    while time.monotonic() < stop_time:
+        try:
+            results.max_threads = max(results.max_threads, process.num_threads())
+            results.max_rss = max(results.max_rss, process.memory_info().rss)
+        except psutil.Error:
+            return
+        await asyncio.sleep(0.5)
+
+
+async def wait_for_server(base_url: str, timeout: float = 30):
+    """Wait until the server answers requests."""
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/system/getMetrics")
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("The Control Server did not start in time.")
+
+
+async def run_fleet(args, base_url: str, pid: int) -> Results:
+    """Start every simulated client and wait for the run to finish."""
+
+    results = Results()
+    await wait_for_server(base_url)
+    stop_time = time.monotonic() + args.duration
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        tasks = [simulate_app(client, i, args.interval, stop_time, results) for i in range(args.clients)]
+        tasks += [subscribe(base_url, stop_time, results) for _ in range(args.subscribers)]
+        tasks.append(run_probe(client, stop_time, results))
+        tasks.append(sample_server(pid, stop_time, results))
+        await asyncio.gather(*tasks)
+
+    return results
+
+
+def summarize(args, results: Results) -> dict:
+    """Reduce the raw measurements to the figures we report."""
+
+    return {
+        "clients": args.clients,
+        "subscribers": args.subscribers,
+        "duration": args.duration,
+        "pings": len(results.ping_latencies),
+        "ping_errors": results.ping_errors,
+        "pings_per_second": len(results.ping_latencies) / args.duration,
+        "ping_p50_ms": percentile(results.ping_latencies, 0.5) * 1000,
+        "ping_p99_ms": percentile(results.ping_latencies, 0.99) * 1000,
+        "sse_events": results.sse_events,
+        "sse_kib_per_subscriber": results.sse_bytes / 1024 / max(1, args.subscribers),
+        "sse_lag_p50_ms": percentile(results.sse_lags, 0.5) * 1000,
+        "sse_lag_p99_ms": percentile(results.sse_lags, 0.99) * 1000,
+        "server_max_threads": results.max_threads,
+        "server_max_rss_mib": results.max_rss / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Control Server ping and update stream paths.")
+    parser.add_argument("--clients", type=int, default=50, help="Number of simulated Constellation Apps")
+    parser.add_argument("--subscribers", type=int, default=5, help="Number of simulated web consoles")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run the load")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between pings from each app")
+    parser.add_argument("--connections", type=int, default=100, help="Maximum concurrent ping connections")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--app-path", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.app_path, args.port)
+        return
+
+    port = get_free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as app_path:
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                                   "--serve", "--app-path", app_path, "--port", str(port)],
+                                  cwd=CONTROL_SERVER_PATH)
+        try:
+            results = asyncio.run(run_fleet(args, base_url, server.pid))
+        finally:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    summary = summarize(args, results)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{args.clients} apps pinging every {args.interval} s, {args.subscribers} web consoles, "
+          f"{args.duration} s")
+    print(f"  Pings:        {summary['pings']} ok, {summary['ping_errors']} errors, "
+          f"{summary['pings_per_second']:.1f}/s")
+    print(f"  Ping latency: p50 {summary['ping_p50_ms']:.1f} ms, p99 {summary['ping_p99_ms']:.1f} ms")
+    print(f"  SSE:          {summary['sse_events']} events, "
+          f"{summary['sse_kib_per_subscriber']:.0f} KiB per subscriber")
+    print(f"  SSE lag:      p50 {summary['sse_lag_p50_ms']:.1f} ms, p99 {summary['sse_lag_p99_ms']:.1f} ms")
+    print(f"  Server:       {summary['server_max_threads']} threads, "
+          f"{summary['server_max_rss_mib']:.0f} MiB RSS (peak)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measure Argon2 login throughput for a burst of simultaneous logins.
+
+Compares verifying on the default thread pool, as the login endpoint used to, with the dedicated
+password pool, for the given cost parameters. Throughput should be similar, since Argon2 releases the
+GIL; the password pool bounds how many hashes run at once. Run from the control_server directory:
+
+    python benchmarks/password_benchmark.py --logins 200 --time-cost 2 --memory-cost 19456
+"""
+
+# Standard imports
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Constellation imports
+import config as c_config
+import constellation_users as c_users
+
+
+async def run_burst(verify, password_hash: str, logins: int) -> float:
+    """Verify the password logins times at once and return the elapsed seconds."""
+
+    start = time.monotonic()
+    results = await asyncio.gather(*[verify(password_hash, "password") for _ in range(logins)])
+    assert all(results)
+    return time.monotonic() - start
+
+
+async def verify_in_thread(password_hash: str, password: str) -> bool:
+    return await asyncio.to_thread(c_users.verify_password_in_worker, password_hash, password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Argon2 password verification under a login burst.")
+    parser.add_argument("--logins", type=int, default=100, help="Number of simultaneous logins")
+    parser.add_argument("--time-cost", type=int, default=c_config.argon2_time_cost)
+    parser.add_argument("--memory-cost", type=int, default=c_config.argon2_memory_cost, help="KiB")
+    parser.add_argument("--parallelism", type=int, default=c_config.argon2_parallelism)
+    parser.add_argument("--workers", type=int, default=c_config.argon2_workers, help="Password pool threads")
+    args = parser.parse_args()
+
+    c_config.argon2_workers = args.workers
+    password_hash = c_users.hash_password_in_worker("password", args.time_cost, args.memory_cost, args.parallelism)
+    print(f"{args.logins} logins, time_cost={args.time_cost}, memory_cost={args.memory_cost} KiB, "
+          f"parallelism={args.parallelism}, {args.workers} workers\n")
+
+    threaded = asyncio.run(run_burst(verify_in_thread, password_hash, args.logins))
+    print(f"{'Default thread pool':<24} {threaded:6.2f} s  {args.logins / threaded:7.1f} logins/s")
+    pooled = asyncio.run(run_burst(c_users.async_verify_password, password_hash, args.logins))
+    print(f"{'Password pool':<24} {pooled:6.2f} s  {args.logins / pooled:7.1f} logins/s")
+    print(f"\nPassword pool metrics: {c_users.get_password_pool_metrics()}")
+
+    c_users.shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    main()
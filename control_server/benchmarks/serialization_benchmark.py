@@ -0,0 +1,98 @@
+"""Compare JSON encoders on a large send_webpage_update() payload.
+
+Run from the control_server directory:
+
+    python benchmarks/serialization_benchmark.py --components 2000
+"""
+
+# Standard imports
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Constellation imports
+import config as c_config
+
+
+def build_payload(num_components: int, send_webpage_update) -> dict:
+    """Create num_components components that look like a busy gallery and return the webpage update."""
+
+    import constellation_exhibit as c_exhibit
+
+    for i in range(num_components):
+        c_exhibit.update_exhibit_component_status({
+            "id": f"Component {i}",
+            "uuid": str(uuid.uuid4()),
+            "helperAddress": f"http://10.0.{i // 250}.{i % 250}:8000",
+            "constellation_app_id": "media_player",
+            "currentInteraction": i % 3 == 0,
+            "platform_details": {"operating_system": "Windows 11", "browser": "Chrome 118"},
+            "permissions": {"audio": True, "refresh": True, "restart": True, "shutdown": False}
+        }, f"10.0.{i // 250}.{i % 250}")
+
+    return send_webpage_update()
+
+
+def report(name: str, func, number: int, baseline: float | None = None) -> float:
+    """Time func and print the mean time per call."""
+
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    line = f"{name:<40} {seconds * 1000:8.2f} ms"
+    if baseline is not None:
+        line += f"  ({baseline / seconds:.1f}x)"
+    print(line)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of the webpage update.")
+    parser.add_argument("--components", type=int, default=1000, help="Number of simulated components")
+    parser.add_argument("--number", type=int, default=20, help="Calls per timing run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_path:
+        # The Constellation modules set up logging to control_server.log in the code directory when
+        # imported, unless logging is already configured
+        logging.basicConfig(filename=os.path.join(app_path, "control_server.log"), level=logging.WARNING)
+        import constellation_tools as c_tools
+        import control_server
+
+        # Importing control_server points APP_PATH at the code directory
+        c_config.APP_PATH = app_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            c_tools.check_file_structure()
+        c_tools.write_json([], c_tools.get_path(["exhibits", "Default.json"], user_file=True))
+        c_config.current_exhibit = "Default"
+        c_config.exhibit_configuration = []
+
+        payload = build_payload(args.components, control_server.send_webpage_update)
+        size = len(c_tools.json_dumps(payload))
+        print(f"{args.components} components, {size / 1024:.0f} KiB serialized")
+        print(f"orjson available: {c_tools.orjson is not None}\n")
+
+        baseline = report("json.dumps(default=str)",
+                          lambda: json.dumps(payload, default=str), args.number)
+        report("c_tools.json_dumps",
+               lambda: c_tools.json_dumps(payload), args.number, baseline)
+
+        pretty_baseline = report("json.dumps(indent=2, sort_keys=True)",
+                                 lambda: json.dumps(payload, default=str, indent=2, sort_keys=True), args.number)
+        report("c_tools.json_dumps(pretty=True)",
+               lambda: c_tools.json_dumps(payload, pretty=True), args.number, pretty_baseline)
+
+        data = c_tools.json_dumps(payload)
+        loads_baseline = report("json.loads", lambda: json.loads(data), args.number)
+        report("c_tools.json_loads", lambda: c_tools.json_loads(data), args.number, loads_baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,24 @@
 """Helper classes for BaseComponent and its derivatives."""
 
 # Standard imports
+import asyncio
 import datetime
-import threading
 import time
-from typing import Union
+from typing import Callable, Union
 
 # Constellation imports
-import config
+import constellation_tools as c_tools
 
 
 class ComponentStatusManager:
 
+    # Seconds to wait in each status before moving to the next one
+    timer_durations = {
+        "ACTIVE": 10,
+        "ONLINE": 30,
+        "WAITING": 30
+    }
+
     def __init__(self, category):
 
         self.category: str = category
@@ -22,7 +29,7 @@ class ComponentStatusManager:
 
         self.last_contact_datetime: Union[datetime.datetime, None] = None
         self.last_interaction_datetime: Union[datetime.datetime, None] = None
-        self.timer_reference: Union[threading.Timer, None] = None
+        self.timer_reference: Union[c_tools.TimerHandle, None] = None
 
     def update_last_contact_datetime(self, interaction: bool = False):
 
@@ -36,34 +43,102 @@ class ComponentStatusManager:
 
     def set_status(self, status):
         if self.status != status:
-            config.last_update_time = time.time()
+            c_tools.notify_update("components")
 
         self.status = status
         self.start_timer(status)
 
     def expire_timer(self, mode):
-        """When the timer expires, change the status and start a new timer, if needed."""
+        """When the timer expires, change the status. This starts a new timer, if needed."""
+
+        if self.timer_reference is not None and self.timer_reference.fired:
+            # This is the timer that is firing, so there is nothing left to cancel
+            self.timer_reference = None
+
+        if self.status != mode:
+            # A ping changed the status while this timer was firing
+            return
 
         if mode == "ACTIVE":
             self.set_status("ONLINE")
-            self.start_timer("ONLINE")
         elif mode == "ONLINE":
             self.set_status("WAITING")
-            self.start_timer("WAITING")
         elif mode == "WAITING":
             self.set_status("OFFLINE")
 
-        return
-
     def start_timer(self, mode):
-        timer_durations = {
-            "ACTIVE": 10,
-            "ONLINE": 30,
-            "WAITING": 30
-        }
-        if mode in timer_durations:
-            if self.timer_reference is not None and self.timer_reference.is_alive():
-                self.timer_reference.cancel()
-            self.timer_reference = threading.Timer(timer_durations[mode], self.expire_timer, args=[mode])
-            self.timer_reference.start()
+        """Schedule the transition out of the given status on the shared timer queue."""
+
+        self.cancel_timer()
+        if mode in self.timer_durations:
+            self.timer_reference = c_tools.timer_queue.call_later(self.timer_durations[mode],
+                                                                  self.expire_timer, mode)
+
+    def cancel_timer(self):
+        """Cancel any pending status transition."""
+
+        if self.timer_reference is not None:
+            self.timer_reference.cancel()
+            self.timer_reference = None
+
+
+class PollingPolicy:
+    """Decide when a device should next be polled.
+
+    While the device's state stays the same, the interval doubles up to a ceiling. A state change or a
+    command snaps it back to the base interval.
+    """
+
+    # Polls to make at the base interval after a reset before backing off again
+    fast_poll_count = 3
+
+    def __init__(self, base_interval: Callable[[], float], max_interval: Callable[[], float]):
+
+        # Callables, so that changes to the configuration take effect right away
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+
+        self.interval: float = base_interval()
+        self.next_poll_time: float = 0  # In terms of time.monotonic(). Poll right away.
+        self.fast_polls_remaining: int = self.fast_poll_count
+
+    def is_due(self, now: float) -> bool:
+        return now >= self.next_poll_time
+
+    def record_poll(self, changed: bool):
+        """Schedule the next poll based on whether the last one found a change."""
+
+        if changed or self.fast_polls_remaining > 0:
+            self.interval = self.base_interval()
+            self.fast_polls_remaining = max(self.fast_polls_remaining - 1, 0)
+            if changed:
+                self.fast_polls_remaining = self.fast_poll_count
+        else:
+            self.interval = min(self.interval * 2, self.max_interval())
+        self.next_poll_time = time.monotonic() + self.interval
+
+    def reset(self):
+        """Return to fast polling, e.g., because a command was just sent."""
+
+        self.interval = self.base_interval()
+        self.fast_polls_remaining = self.fast_poll_count
+        self.next_poll_time = min(self.next_poll_time, time.monotonic() + self.interval)
+
+
+async def poll_due_devices(devices: list, concurrency: int):
+    """Call async_update() on each device whose polling policy is due, with at most concurrency at once."""
+
+    now = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def update(device):
+        async with semaphore:
+            await device.async_update()
 
+    due = [device for device in devices if device.polling_policy.is_due(now)]
+    results = await asyncio.gather(*[update(device) for device in due], return_exceptions=True)
+    for device, result in zip(due, results):
+        if isinstance(result, Exception):
+            # Try again later instead of on every tick
+            device.polling_policy.record_poll(False)
+            print(f"poll_due_devices: error updating {device.id}:", result)
@@ -1,6 +1,7 @@
 export default {
   availableExhibits: [], // An array of strings
   componentGroups: [],
+  componentStates: {}, // Latest component dicts from the update stream, keyed by uuid
   currentExhibit: '',
   errorDict: {},
   exhibitComponents: [],
@@ -16,6 +17,7 @@ export default {
   scheduleUpdateTime: 0,
   serverAddress: '',
   serverSoftwareUpdateAvailable: false,
+  updateVersion: 0, // Version of the last update stream event we applied
   STATUS: {
     STATIC: { name: 'STATIC', value: 0, colorClass: 'btn-secondary' },
     ACTIVE: { name: 'ACTIVE', value: 1, colorClass: 'btn-primary' },
@@ -23,6 +25,7 @@ export default {
     STANDBY: { name: 'STANDBY', value: 2, colorClass: 'btn-info' },
     WAITING: { name: 'WAITING', value: 3, colorClass: 'btn-warning' },
     'SYSTEM ON': { name: 'SYSTEM ON', value: 4, colorClass: 'btn-info' },
+    PROBING: { name: 'PROBING', value: 5, colorClass: 'btn-secondary' },
     UNKNOWN: { name: 'UNKNOWN', value: 5, colorClass: 'btn-warning' },
     OFFLINE: { name: 'OFFLINE', value: 6, colorClass: 'btn-danger' }
   },
@@ -1,6 +1,8 @@
 """Defines configuration variables that can be shared across classes, etc."""
 
 # Standard imports
+import asyncio
+import collections
 import datetime
 import threading
 from typing import Any, Union
@@ -15,13 +17,23 @@ gallery_name: str = "Constellation"
 port: int = 8000
 ip_address: str = "localhost"
 last_update_time: float = 0  # Will hold time.time() of last change to the server
+update_sequence: int = 0  # Increases by one on every change, so changes within one clock tick are still seen
+update_sections: tuple[str, ...] = ("components", "gallery", "groups", "issues", "schedule")
+section_versions: dict[str, int] = {section: 0 for section in update_sections}  # Bumped when a section changes
+update_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []  # Tasks waiting for the next change
+updateWaitersLock: threading.Lock = threading.Lock()
+update_stream_min_interval: float = 0.1  # Minimum seconds between events sent on each update stream
+write_behind_delay: float = 1  # Seconds to coalesce repeated writes of a component file
 
 software_version: float = 5
 software_update_available: bool = False
 software_update_available_version: str = ""
 
 # Threading resources
-polling_thread_dict: dict[str, threading.Timer] = {}
+polling_thread_dict: dict[str, Any] = {}  # Each value must support .cancel()
+event_loop: Union[asyncio.AbstractEventLoop, None] = None  # Background loop for asynchronous network tasks
+http_client = None  # Shared httpx.AsyncClient, created on the background loop by c_tools.get_http_client()
+eventLoopLock: threading.Lock = threading.Lock()
 logLock: threading.Lock = threading.Lock()
 galleryConfigurationLock: threading.Lock = threading.Lock()
 trackingDataWriteLock: threading.Lock = threading.Lock()
@@ -32,6 +44,25 @@ exhibitsLock: threading.Lock = threading.Lock()
 maintenanceLock: threading.Lock = threading.Lock()
 issueMediaLock: threading.Lock = threading.Lock()
 
+# Latency polling
+latency_poll_interval: float = 10  # Seconds between sweeps
+latency_poll_concurrency: int = 50  # Maximum number of simultaneous pings
+latency_sweep_duration: float = 0  # Seconds taken by the most recent sweep
+latency_sweep_host_count: int = 0  # Number of addresses pinged in the most recent sweep
+
+# Projector polling
+projector_poll_interval: float = 5  # Seconds between polls of each projector
+projector_poll_concurrency: int = 20  # Maximum number of projectors polled at once
+projector_poll_timeout: float = 4  # Seconds allowed for each projector to respond to a poll
+projector_command_concurrency: int = 10  # Maximum number of projector commands sent at once
+helper_command_concurrency: int = 20  # Maximum number of helpers contacted at once by a broadcast command
+helper_command_timeout: float = 5  # Seconds to wait for a helper to respond to a command
+helper_command_retries: int = 2  # Times to retry a helper command that could not connect
+projector_poll_max_interval: float = 60  # Longest wait between polls of a projector whose state is stable
+wol_poll_interval: float = 30  # Seconds between pings of each Wake on LAN device
+wol_poll_max_interval: float = 300  # Longest wait between pings of a Wake on LAN device whose state is stable
+wol_poll_concurrency: int = 50  # Maximum number of Wake on LAN devices pinged at once
+
 # Lists
 componentList = []
 projectorList = []
@@ -39,10 +70,26 @@ wakeOnLANList = []
 synchronizationList = []  # Holds sets of displays that are being synchronized
 componentDescriptions = {}  # Holds optional short descriptions of each component
 
+# Indexes for constant-time lookups by uuid or id, kept in sync with the lists above
+componentIndex: dict[str, dict[str, Any]] = {"uuid": {}, "id": {}}
+projectorIndex: dict[str, dict[str, Any]] = {"uuid": {}, "id": {}}
+wakeOnLANIndex: dict[str, dict[str, Any]] = {"uuid": {}, "id": {}}
+groupIndex: dict[str, dict[str, Any]] = {}  # Group uuid: {component uuid: component}, across all three lists
+
 # Group stuff
 group_list: list[dict[str, Any]] = []
 group_list_last_update_date = datetime.datetime.now().isoformat()
 
+# Web console updates
+webpage_update_sequence: int = -1  # The update_sequence the current version was built from
+webpage_update_version: int = 0  # Increases by one each time the update changes
+webpage_update_section_versions: dict[str, int] = {}  # The section_versions the current version was built from
+webpage_update_section_json: dict[str, str] = {}  # Serialized sections for the current version
+webpage_update_snapshot: str = ""  # Serialized full update for the current version
+webpage_update_components: dict[str, dict[str, Any]] = {}  # Component dicts sent in the current version, by uuid
+webpage_update_deltas: collections.deque = collections.deque(maxlen=100)  # (version, serialized delta) pairs
+webpageUpdateLock: threading.Lock = threading.Lock()
+
 # Dictionary to keep track of warnings we have already presented
 serverWarningDict = {}
 
@@ -51,8 +98,14 @@ issueList_last_update_date = datetime.datetime.now().isoformat()
 issueList = []
 
 # Schedule stuff
-schedule_timers: list[threading.Timer] = []
+schedule_timers: dict[str, Any] = {}  # Schedule ID: (TimerHandle, event) for today's queued events
+schedule_queue: list[tuple[float, str]] = []  # (time_in_seconds, schedule ID) of today's queued events, sorted
+schedule_reload_timer = None  # TimerHandle that rebuilds the schedule at midnight
+schedule_reboot_timer = None  # TimerHandle that reboots the server at serverRebootTime
+queued_schedule_name: Union[str, None] = None  # The file that today's queued events came from
 json_schedule_list: list[dict] = []
+json_schedule_sources: dict[str, tuple] = {}  # Date: (file name, mtime, size) that json_schedule_list was built from
+schedule_file_cache: dict[str, tuple[int, int, dict]] = {}  # File name: (mtime, size, parsed schedule)
 json_next_event = []
 scheduleList = []
 nextEvent = {}
@@ -67,4 +120,29 @@ exhibit_list: list[str] = []
 
 # User stuff
 encryption_key: bytes | None = None
+fernet = None  # Fernet instance built from fernet_key, shared by every token operation
+fernet_key: bytes | None = None
 user_list: list = []
+userIndex: dict[str, dict[str, Any]] = {"uuid": {}, "username": {}}  # Usernames are stored lowercase
+user_activity_dirty: bool = False  # True when a user's last_activity has changed since users.json was saved
+user_activity_flush_interval: float = 60  # Seconds between saves of changed last_activity times
+user_activity_timer = None  # TimerHandle for the next flush of last_activity times
+admin_user = None  # The root admin User, loaded from root_admin.txt
+admin_file_mtime: int | None = None  # mtime of root_admin.txt when admin_user was loaded
+
+# Argon2 password hashing, which runs in its own pool of threads
+argon2_time_cost: int = 1
+argon2_memory_cost: int = 1024  # KiB
+argon2_parallelism: int = 1
+argon2_workers: int = 2  # Number of threads hashing and verifying passwords
+password_pool = None  # ThreadPoolExecutor created by c_users.get_password_pool()
+password_pool_pending: int = 0  # Hashes and verifications submitted but not yet finished
+password_pool_completed: int = 0
+password_pool_total_time: float = 0  # Seconds from submission to completion, summed over completed tasks
+passwordPoolLock: threading.Lock = threading.Lock()
+
+# Authenticated tokens, so each request doesn't have to decrypt its cookie again
+token_cache: collections.OrderedDict[str, tuple[str, float]] = collections.OrderedDict()  # Token: (user uuid, expiration)
+token_cache_ttl: float = 300  # Seconds before a cached token must be decrypted again
+token_cache_size: int = 1024  # Maximum number of tokens to cache
+tokenCacheLock: threading.Lock = threading.Lock()
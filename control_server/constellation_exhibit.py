@@ -1,17 +1,18 @@
 # Standard imports
+import asyncio
 import datetime
 import json
 import logging
 import shutil
-import threading
+import socket
 import time
 import uuid
 from typing import Any, Union
 import os
 
 # Non-standard imports
+import httpx
 import icmplib
-import requests
 import wakeonlan
 
 # Constellation imports
@@ -48,7 +49,6 @@ class BaseComponent:
         self.WOL_port: int = 9
 
         self.latency: Union[None, float] = None  # Latency between Control Server and the device in ms
-        self.latency_timer: Union[threading.Timer, None] = None
 
         if last_contact_datetime == "" or last_contact_datetime == "None":
             self.last_contact_datetime = now_date
@@ -80,12 +80,31 @@ class BaseComponent:
     def __repr__(self):
         return repr(f"[BaseComponent ID: {self.id} Groups: {self.groups} UUID: {self.uuid}]")
 
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @id.setter
+    def id(self, new_id: str):
+        old_id = getattr(self, "_id", None)
+        self._id = new_id
+        if old_id is not None and old_id != new_id:
+            reindex_component_id(self, old_id)
+
+    @property
+    def groups(self) -> list[str]:
+        return self._groups
+
+    @groups.setter
+    def groups(self, new_groups: list[str]):
+        old_groups = getattr(self, "_groups", None)
+        self._groups = new_groups
+        if old_groups is not None:
+            reindex_component_groups(self, old_groups)
+
     def clean_up(self):
         """Stop any timers so the class instance can be safely removed."""
 
-        if self.latency_timer is not None:
-            self.latency_timer.cancel()
-
     def remove(self):
         """Remove the component from Control Server tracking.
 
@@ -93,6 +112,7 @@ class BaseComponent:
         """
 
         self.clean_up()
+        unindex_component(self)
         if isinstance(self, ExhibitComponent):
             config.componentList = [x for x in config.componentList if x.uuid != self.uuid]
         elif isinstance(self, Projector):
@@ -100,7 +120,13 @@ class BaseComponent:
         elif isinstance(self, WakeOnLANDevice):
             config.wakeOnLANList = [x for x in config.wakeOnLANList if x.uuid != self.uuid]
         path = c_tools.get_path(["components", self.uuid + '.json'], user_file=True)
-        os.remove(path)
+        c_tools.write_behind_queue.discard(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # The component was never written to disk
+            pass
+        c_tools.notify_update("components")
 
     def seconds_since_last_contact(self) -> float:
         """The number of seconds since the last successful contact with the component."""
@@ -111,32 +137,7 @@ class BaseComponent:
     def update_last_contact_datetime(self):
 
         self.last_contact_datetime = datetime.datetime.now()
-        config.last_update_time = time.time()
-
-    def poll_latency(self):
-        """If we have an IP address, ping the host to measure its latency."""
-
-        if self.ip_address is not None:
-            try:
-                ping = icmplib.ping(self.ip_address, privileged=False, count=1, timeout=1)
-                if ping.is_alive:
-                    self.latency = ping.avg_rtt
-                else:
-                    self.latency = None
-            except icmplib.exceptions.SocketPermissionError:
-                if "wakeOnLANPrivilege" not in config.serverWarningDict:
-                    config.serverWarningDict["wakeOnLANPrivilege"] = True
-                self.latency = None
-            except icmplib.exceptions.NameLookupError:
-                self.latency = None
-            except Exception as e:
-                print(f"poll_latency: {self.id}: an unknown exception occurred", e)
-                self.latency = None
-
-        self.latency_timer = threading.Timer(10, self.poll_latency)
-        self.latency_timer.name = f"{self.id} latency timer"
-        self.latency_timer.daemon = True
-        self.latency_timer.start()
+        c_tools.notify_update("components")
 
     def get_dict(self) -> dict[str, Any]:
         """Return a dictionary representation of this component.
@@ -155,11 +156,15 @@ class BaseComponent:
         }
 
     def save(self):
-        """Write the component to disk"""
+        """Queue the component to be written to disk.
+
+        Repeated saves within a short window are coalesced into one write. Call
+        c_tools.write_behind_queue.flush() to write immediately.
+        """
         if config.debug:
             print("Saving component to disk: ", self.id, self.uuid)
         path = c_tools.get_path(["components", self.uuid + '.json'], user_file=True)
-        c_tools.write_json(self.get_dict(), path)
+        c_tools.write_behind_queue.schedule(path, self.get_dict)
 
 
 class ExhibitComponent(BaseComponent):
@@ -192,7 +197,6 @@ class ExhibitComponent(BaseComponent):
 
         if category != "static":
             self.update_configuration()
-            self.poll_latency()
         else:
             self.last_contact_datetime = None
 
@@ -202,11 +206,20 @@ class ExhibitComponent(BaseComponent):
         if wol is not None:
             self.mac_address = wol.mac_address
             self.config["permissions"]["shutdown"] = True
+            subsumed = [x for x in config.wakeOnLANList if x.id == wol.id]
             config.wakeOnLANList = [x for x in config.wakeOnLANList if x.id != wol.id]
+            for device in subsumed:
+                unindex_component(device)
 
     def __repr__(self):
         return repr(f"[ExhibitComponent ID: {self.id} Group: {self.groups} UUID: {self.uuid}]")
 
+    def clean_up(self):
+        """Stop any timers so the class instance can be safely removed."""
+
+        super().clean_up()
+        self.status_manager.cancel_timer()
+
     def update_last_contact_datetime(self, interaction: bool = False):
 
         super().update_last_contact_datetime()
@@ -254,7 +267,7 @@ class ExhibitComponent(BaseComponent):
         self.config["current_exhibit"] = os.path.splitext(config.current_exhibit)[0]
 
         if update_made:
-            config.last_update_time = time.time()
+            c_tools.notify_update("components")
 
     def queue_command(self, command: str):
         """Queue a command to be sent to the component on the next ping"""
@@ -265,30 +278,46 @@ class ExhibitComponent(BaseComponent):
         if (command in ["power_on", "wakeDisplay"]) and (self.mac_address is not None):
             self.wake_with_LAN()
         elif command in ['shutdown', 'restart']:
-            # Send these commands directly to the helper
-            print(f"{self.id}: command sent to helper: {command}")
-            requests.get('http://' + self.helperAddress + '/' + command)
+            # Send these commands directly to the helper without waiting for the result
+            c_tools.run_coroutine(self.async_send_helper_command(command))
         else:
             # Queue all other commands for the next ping
             print(f"{self.id}: command queued: {command}")
             self.config["commands"].append(command)
             print(f"{self.id}: pending commands: {self.config['commands']}")
 
+    def send_helper_command(self, command: str) -> str:
+        """Send a command directly to the component's helper, wait, and return "sent" or a description of the error."""
+
+        return c_tools.run_coroutine(self.async_send_helper_command(command)).result()
+
+    async def async_send_helper_command(self, command: str) -> str:
+        """Send a command directly to the component's helper and return "sent" or a description of the error.
+
+        This must run on the background event loop.
+        """
+
+        address = self.helperAddress
+        if not address.startswith("http"):
+            address = "http://" + address
+
+        print(f"{self.id}: command sent to helper: {command}")
+        try:
+            response = await c_tools.http_request("GET", address + '/' + command)
+            # A helper that refuses the command counts as a failure, too
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"{self.id}: error sending command to helper: {e!r}")
+            with config.logLock:
+                logging.error(f"{self.id}: error sending command {command} to helper: {e!r}")
+            return f"error: {e!r}"
+        return "sent"
+
     def wake_with_LAN(self):
         """Send a magic packet waking the device."""
 
         if self.mac_address is not None:
-            print(f"Sending wake on LAN packet to {self.id}")
-            with config.logLock:
-                logging.info(f"Sending wake on LAN packet to {self.id}")
-            try:
-                wakeonlan.send_magic_packet(self.mac_address,
-                                            ip_address=self.WOL_broadcast_address,
-                                            port=self.WOL_port)
-            except ValueError as e:
-                print(f"Wake on LAN error for component {self.id}: {str(e)}")
-                with config.logLock:
-                    logging.error(f"Wake on LAN error for component {self.id}: {str(e)}")
+            send_magic_packets([self])
 
     def get_dict(self) -> dict[str, Any]:
         """Return a dictionary representation of this component.
@@ -329,9 +358,11 @@ class WakeOnLANDevice(BaseComponent):
         self.config["permissions"]["power_on"] = True
         self.config["app_name"] = "wol_only"
 
-        self.state = {"status": "UNKNOWN"}
+        # Without an IP address, we can't check the status
+        self.state = {"status": "PROBING" if ip_address is not None else "UNKNOWN"}
         self.last_contact_datetime = datetime.datetime(2020, 1, 1)
-        self.poll_latency()
+        self.polling_policy = component_helpers.PollingPolicy(lambda: config.wol_poll_interval,
+                                                              lambda: config.wol_poll_max_interval)
 
     def __repr__(self):
         return repr(f"[WakeOnLANDevice ID: {self.id} Group: {self.groups} UUID: {self.uuid}]")
@@ -347,33 +378,30 @@ class WakeOnLANDevice(BaseComponent):
 
         """Function to send a magic packet waking the device"""
 
-        print(f"Sending wake on LAN packet to {self.id}")
-        with config.logLock:
-            logging.info(f"Sending wake on LAN packet to {self.id}")
-        try:
-            wakeonlan.send_magic_packet(self.mac_address,
-                                        ip_address=self.WOL_broadcast_address,
-                                        port=self.WOL_port)
-        except ValueError as e:
-            print(f"Wake on LAN error for component {self.id}: {str(e)}")
-            with config.logLock:
-                logging.error(f"Wake on LAN error for component {self.id}: {str(e)}")
+        send_magic_packets([self])
 
     def update(self):
+        """If we have an IP address, ping the host to see if it is awake and wait for the result."""
 
-        """If we have an IP address, ping the host to see if it is awake"""
+        c_tools.run_coroutine(self.async_update()).result()
 
+    async def async_update(self):
+        """If we have an IP address, ping the host to see if it is awake.
+
+        This must run on the background event loop.
+        """
+
+        prior_status = self.state["status"]
         if self.ip_address is not None:
             try:
-                ping = icmplib.ping(self.ip_address, privileged=False, count=1)
-                prior_status = self.state["status"]
+                ping = await icmplib.async_ping(self.ip_address, privileged=False, count=1)
                 if ping.is_alive:
                     self.state["status"] = "SYSTEM ON"
                     self.last_contact_datetime = datetime.datetime.now()
                 elif self.seconds_since_last_contact() > 60:
                     self.state["status"] = "OFFLINE"
                 if prior_status != self.state["status"]:
-                    config.last_update_time = time.time()
+                    c_tools.notify_update("components")
             except icmplib.exceptions.SocketPermissionError:
                 if "wakeOnLANPrivilege" not in config.serverWarningDict:
                     print(
@@ -384,6 +412,8 @@ class WakeOnLANDevice(BaseComponent):
         else:
             self.state["status"] = "UNKNOWN"
 
+        self.polling_policy.record_poll(prior_status != self.state["status"])
+
     def get_dict(self):
         """Return a dictionary representation of this component.
 
@@ -401,6 +431,13 @@ class WakeOnLANDevice(BaseComponent):
 class Projector(BaseComponent):
     """Holds basic data about a projector."""
 
+    # Translate commands for projector_control
+    command_aliases = {
+        "shutdown": "power_off",
+        "sleepDisplay": "power_off",
+        "wakeDisplay": "power_on"
+    }
+
     def __init__(self,
                  id_: str,
                  groups: list[str],
@@ -431,74 +468,97 @@ class Projector(BaseComponent):
         self.config["permissions"] = {"sleep": True}
         self.config["app_name"] = "projector"
 
-        self.state = {"status": "OFFLINE"}
-
-        self.update()
-        self.poll_latency()
+        # The first poll, which happens in the background shortly after the projector is added, sets the real status
+        self.state = {"status": "PROBING"}
+        self.pjlink: projector_control.PJLinkClient | None = None
+        self.polling_policy = component_helpers.PollingPolicy(lambda: config.projector_poll_interval,
+                                                              lambda: config.projector_poll_max_interval)
 
     def __repr__(self):
         return repr(f"[Projector ID: {self.id} Group: {self.groups} UUID: {self.uuid}]")
 
+    def clean_up(self):
+        """Close the PJLink connection."""
+
+        super().clean_up()
+        if self.pjlink is not None:
+            c_tools.get_event_loop().call_soon_threadsafe(self.pjlink.close)
+            self.pjlink = None
+
+    def get_pjlink_client(self) -> projector_control.PJLinkClient:
+        """Return the PJLink client for this projector, replacing it if the address or password has changed."""
+
+        if self.pjlink is None or self.pjlink.ip_address != self.ip_address or self.pjlink.password != self.password:
+            if self.pjlink is not None:
+                self.pjlink.close()
+            self.pjlink = projector_control.PJLinkClient(self.ip_address, password=self.password)
+        return self.pjlink
+
     def update(self):
+        """Contact the projector to get the latest state and wait for the result."""
+
+        c_tools.run_coroutine(self.async_update()).result()
 
-        """Contact the projector to get the latest state"""
+    async def async_update(self):
+        """Contact the projector to get the latest state.
+
+        This must run on the background event loop.
+        """
+
+        prior_state = (self.state["status"], self.state.get("power_state", None), self.state.get("error_status", None))
 
         error = False
         try:
-            connection = projector_control.pjlink_connect(self.ip_address, password=self.password)
-            self.state["model"] = projector_control.pjlink_send_command(connection, "get_model")
-            self.state["power_state"] = projector_control.pjlink_send_command(connection, "power_state")
-            self.state["lamp_status"] = projector_control.pjlink_send_command(connection, "lamp_status")
-            self.state["error_status"] = projector_control.pjlink_send_command(connection, "error_status")
-
+            status = await asyncio.wait_for(self.get_pjlink_client().get_status(), config.projector_poll_timeout)
+            self.state.update(status)
             self.update_last_contact_datetime()
-        except Exception as e:
-            # print(e)
+        except (projector_control.PJLinkError, asyncio.TimeoutError):
             error = True
 
         prior_status = self.state["status"]
         if error and (self.seconds_since_last_contact() > 60):
             self.state = {"status": "OFFLINE"}
         else:
-            if self.state["power_state"] == "on":
+            if self.state.get("power_state", None) == "on":
                 self.state["status"] = "ONLINE"
             else:
                 self.state["status"] = "STANDBY"
         if prior_status != self.state["status"]:
-            config.last_update_time = time.time()
+            c_tools.notify_update("components")
+
+        new_state = (self.state["status"], self.state.get("power_state", None), self.state.get("error_status", None))
+        self.polling_policy.record_poll(new_state != prior_state)
 
     def queue_command(self, cmd: str):
-        """Function to spawn a thread that sends a command to the projector.
+        """Queue a command to be sent to the projector by the shared command executor.
 
         Named "queue_command" to match what is used for exhibitComponents
         """
 
+        cmd = self.command_aliases.get(cmd, cmd)
         print(f"Queuing command {cmd} for {self.id}")
-        thread_ = threading.Thread(target=self.send_command,
-                                   args=[cmd],
-                                   name=f"CommandProjector_{self.id}_{str(time.time())}")
-        thread_.daemon = True
-        thread_.start()
+
+        # Only the latest waiting power command matters
+        coalesce_key = "power" if cmd in ["power_on", "power_off"] else cmd
+        c_tools.command_executor.submit(self.uuid, cmd, lambda: self.async_send_command(cmd), coalesce_key)
 
     def send_command(self, cmd: str):
-        """Connect to a PJLink projector and send a command"""
+        """Connect to a PJLink projector, send a command, and wait for the result."""
 
-        # Translate commands for projector_control
-        cmd_dict = {
-            "shutdown": "power_off",
-            "sleepDisplay": "power_off",
-            "wakeDisplay": "power_on"
-        }
+        return c_tools.run_coroutine(self.async_send_command(self.command_aliases.get(cmd, cmd))).result()
 
-        try:
-            connection = projector_control.pjlink_connect(self.ip_address, password=self.password)
-            if cmd in cmd_dict:
-                projector_control.pjlink_send_command(connection, cmd_dict[cmd])
-            else:
-                projector_control.pjlink_send_command(connection, cmd)
+    async def async_send_command(self, cmd: str):
+        """Send a PJLink command by its alias. This must run on the background event loop."""
 
-        except Exception as e:
+        try:
+            result = await self.get_pjlink_client().send_command(cmd)
+        except projector_control.PJLinkError as e:
             print(e)
+            result = None
+
+        # Watch closely for the projector to respond
+        self.polling_policy.reset()
+        return result
 
     def get_dict(self):
         """Return a dictionary representation of this projector.
@@ -599,7 +659,8 @@ def add_exhibit_component(this_id: str,
         component.save()
 
     config.componentList.append(component)
-    config.last_update_time = time.time()
+    index_component(component)
+    c_tools.notify_update("components")
 
     return component
 
@@ -630,7 +691,8 @@ def add_projector(this_id: str,
         projector.save()
 
     config.projectorList.append(projector)
-    config.last_update_time = time.time()
+    index_component(projector)
+    c_tools.notify_update("components")
 
     return projector
 
@@ -659,7 +721,8 @@ def add_wake_on_LAN_device(this_id: str,
         component.save()
 
     config.wakeOnLANList.append(component)
-    config.last_update_time = time.time()
+    index_component(component)
+    c_tools.notify_update("components")
 
     return component
 
@@ -674,23 +737,118 @@ def check_available_exhibits():
         for file in os.listdir(exhibits_path):
             if file.lower().endswith(".json"):
                 config.exhibit_list.append(os.path.splitext(file)[0])
+    c_tools.notify_update("gallery")
 
 
-def command_all_exhibit_components(cmd: str):
-    """Queue a command for every exhibit component"""
+def command_all_exhibit_components(cmd: str) -> dict[str, dict[str, str]]:
+    """Send a command to every exhibit component, projector, and Wake on LAN device.
+
+    Returns the result for each, as from command_components().
+    """
 
     print("Sending command to all components:", cmd)
     with config.logLock:
         logging.info("command_all_exhibit_components: %s", cmd)
 
-    for component in config.componentList:
-        component.queue_command(cmd)
+    return command_components(config.componentList + config.projectorList + config.wakeOnLANList, cmd)
 
-    for projector in config.projectorList:
-        projector.queue_command(cmd)
 
-    for device in config.wakeOnLANList:
-        device.queue_command(cmd)
+def command_components(components: list[BaseComponent], cmd: str) -> dict[str, dict[str, str]]:
+    """Send a command to each of the given components at once and wait for the results.
+
+    Returns a dict keyed by uuid with each component's id and result: "sent", "queued", "skipped",
+    or a description of the error. Must not be called from the background event loop.
+    """
+
+    results = c_tools.run_coroutine(dispatch_command(components, cmd)).result()
+    summary = {}
+    for result in results.values():
+        key = result["result"] if not result["result"].startswith("error") else "error"
+        summary[key] = summary.get(key, 0) + 1
+    with config.logLock:
+        logging.info(f"command_components: {cmd}: {summary}")
+    return results
+
+
+async def dispatch_command(components: list[BaseComponent], cmd: str) -> dict[str, dict[str, str]]:
+    """Send a command to each of the given components concurrently. This must run on the background event loop.
+
+    Wake on LAN packets are all sent from one socket, and at most config.helper_command_concurrency
+    helpers are contacted at once.
+    """
+
+    results = {}
+    to_wake = []
+    to_contact = []
+    for component in components:
+        result = "queued"
+        if isinstance(component, Projector):
+            component.queue_command(cmd)
+        elif isinstance(component, WakeOnLANDevice):
+            if cmd in ["power_on", "wakeDisplay"]:
+                to_wake.append(component)
+                continue
+            result = "skipped"
+        elif component.category == "static":
+            result = "skipped"
+        elif cmd in ["power_on", "wakeDisplay"] and component.mac_address is not None:
+            to_wake.append(component)
+            continue
+        elif cmd in ["shutdown", "restart"]:
+            to_contact.append(component)
+            continue
+        else:
+            component.queue_command(cmd)
+        results[component.uuid] = {"id": component.id, "result": result}
+
+    for component, result in zip(to_wake, send_magic_packets(to_wake)):
+        results[component.uuid] = {"id": component.id, "result": result}
+
+    semaphore = asyncio.Semaphore(config.helper_command_concurrency)
+
+    async def contact(component):
+        async with semaphore:
+            return await component.async_send_helper_command(cmd)
+
+    for component, result in zip(to_contact, await asyncio.gather(*[contact(x) for x in to_contact])):
+        results[component.uuid] = {"id": component.id, "result": result}
+
+    return results
+
+
+def send_magic_packets(components: list[BaseComponent]) -> list[str]:
+    """Send a Wake on LAN magic packet to each component from a single socket.
+
+    Returns "sent" or a description of the error for each component, in order.
+    """
+
+    if len(components) == 0:
+        return []
+
+    ids = ", ".join(component.id for component in components)
+    print(f"Sending wake on LAN packets to {ids}")
+    with config.logLock:
+        logging.info(f"Sending wake on LAN packets to {ids}")
+
+    results = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        for component in components:
+            try:
+                packet = wakeonlan.create_magic_packet(component.mac_address)
+                sock.sendto(packet, (component.WOL_broadcast_address, component.WOL_port))
+                results.append("sent")
+            except (ValueError, TypeError, OSError) as e:
+                print(f"Wake on LAN error for component {component.id}: {str(e)}")
+                with config.logLock:
+                    logging.error(f"Wake on LAN error for component {component.id}: {str(e)}")
+                results.append(f"error: {e}")
+
+            if isinstance(component, WakeOnLANDevice):
+                # Watch closely for the device to wake up
+                component.polling_policy.reset()
+
+    return results
 
 
 def create_new_exhibit(name: str, clone: Union[str, None]):
@@ -718,7 +876,6 @@ def create_new_exhibit(name: str, clone: Union[str, None]):
         # Make a new file
         c_tools.write_json([], new_file)
 
-    config.last_update_time = time.time()
     check_available_exhibits()
 
 
@@ -737,7 +894,6 @@ def delete_exhibit(name: str):
         except FileNotFoundError:
             print(f"Error: Unable to delete exhibit {file_to_delete}. File not found!")
 
-    config.last_update_time = time.time()
     check_available_exhibits()
 
 
@@ -750,9 +906,9 @@ def get_exhibit_component(component_id: str = "", component_uuid: str = "") -> E
         raise ValueError("Must specify one of 'component_id' or 'component_uuid'")
 
     if component_id != "":
-        component = next((x for x in config.componentList if x.id == component_id), None)
+        component = config.componentIndex["id"].get(component_id, None)
     else:
-        component = next((x for x in config.componentList if x.uuid == component_uuid), None)
+        component = config.componentIndex["uuid"].get(component_uuid, None)
 
     if component is None:
         # Try projector
@@ -775,9 +931,9 @@ def get_projector(projector_id: str = "", projector_uuid: str = "") -> Projector
         raise ValueError("Must specify one of 'projector_id' or 'projector_uuid'")
 
     if projector_id != "":
-        return next((x for x in config.projectorList if x.id == projector_id), None)
+        return config.projectorIndex["id"].get(projector_id, None)
     if projector_uuid != "":
-        return next((x for x in config.projectorList if x.uuid == projector_uuid), None)
+        return config.projectorIndex["uuid"].get(projector_uuid, None)
     return None
 
 
@@ -790,24 +946,196 @@ def get_wake_on_LAN_component(component_id: str = "", component_uuid: str = "")
         raise ValueError("Must specify one of 'component_id' or 'component_uuid'")
 
     if component_id != "":
-        return next((x for x in config.wakeOnLANList if x.id == component_id), None)
+        return config.wakeOnLANIndex["id"].get(component_id, None)
     if component_uuid != "":
-        return next((x for x in config.wakeOnLANList if x.uuid == component_uuid), None)
+        return config.wakeOnLANIndex["uuid"].get(component_uuid, None)
     return None
 
 
+def get_component_registry(component: BaseComponent) -> tuple[list[BaseComponent], dict[str, dict[str, Any]]]:
+    """Return the list and the uuid/id index that track components of the given type."""
+
+    if isinstance(component, Projector):
+        return config.projectorList, config.projectorIndex
+    if isinstance(component, WakeOnLANDevice):
+        return config.wakeOnLANList, config.wakeOnLANIndex
+    return config.componentList, config.componentIndex
+
+
+def index_component(component: BaseComponent):
+    """Add the component to the lookup indexes for its type."""
+
+    _, index = get_component_registry(component)
+    index["uuid"][component.uuid] = component
+    # If ids collide, the earliest component keeps the id, matching a search of the list
+    index["id"].setdefault(component.id, component)
+    for group in component.groups:
+        config.groupIndex.setdefault(group, {})[component.uuid] = component
+
+
+def unindex_component(component: BaseComponent):
+    """Remove the component from the lookup indexes for its type."""
+
+    _, index = get_component_registry(component)
+    if index["uuid"].get(component.uuid) is component:
+        del index["uuid"][component.uuid]
+    release_component_id(component, component.id)
+    release_component_groups(component, component.groups)
+
+
+def release_component_id(component: BaseComponent, id_: str):
+    """Drop the id index entry held by the component, handing it to any other component with the same id."""
+
+    component_list, index = get_component_registry(component)
+    if index["id"].get(id_) is not component:
+        return
+    del index["id"][id_]
+    for other in component_list:
+        if other is not component and other.id == id_:
+            index["id"][id_] = other
+            break
+
+
+def reindex_component_id(component: BaseComponent, old_id: str):
+    """Update the id index after the component's id has changed."""
+
+    _, index = get_component_registry(component)
+    if index["uuid"].get(component.uuid) is not component:
+        # The component isn't being tracked (e.g., it is still being built)
+        return
+    release_component_id(component, old_id)
+    index["id"].setdefault(component.id, component)
+
+
+def release_component_groups(component: BaseComponent, groups: list[str]):
+    """Remove the component from the group index entries for the given groups."""
+
+    for group in groups:
+        members = config.groupIndex.get(group, {})
+        if members.get(component.uuid) is component:
+            del members[component.uuid]
+            if len(members) == 0:
+                del config.groupIndex[group]
+
+
+def reindex_component_groups(component: BaseComponent, old_groups: list[str]):
+    """Update the group index after the component's groups have changed."""
+
+    _, index = get_component_registry(component)
+    if index["uuid"].get(component.uuid) is not component:
+        # The component isn't being tracked (e.g., it is still being built)
+        return
+    release_component_groups(component, old_groups)
+    for group in component.groups:
+        config.groupIndex.setdefault(group, {})[component.uuid] = component
+
+
+def get_group_components(group_uuid: str) -> list[BaseComponent]:
+    """Return every component, projector, and Wake on LAN device in the given group."""
+
+    return list(config.groupIndex.get(group_uuid, {}).values())
+
+
 def poll_wake_on_LAN_devices():
-    """Ask every Wake on LAN device to report its status at an interval.
+    """Begin checking the status of the Wake on LAN devices from the background event loop.
+
+    Each device is polled according to its own PollingPolicy.
     """
 
-    for device in config.wakeOnLANList:
-        new_thread = threading.Thread(target=device.update, name=f"Poll_WOL_{device.id}_{str(time.time())}")
-        new_thread.daemon = True  # So it dies if we exit
-        new_thread.start()
+    config.polling_thread_dict["poll_wake_on_LAN_devices"] = c_tools.run_coroutine(wake_on_LAN_poll_loop())
+
+
+async def wake_on_LAN_poll_loop():
+    """Poll every Wake on LAN device that is due, checking once per second."""
+
+    while True:
+        try:
+            await component_helpers.poll_due_devices(list(config.wakeOnLANList), config.wol_poll_concurrency)
+        except Exception as e:
+            print("wake_on_LAN_poll_loop: an unknown exception occurred", e)
+            with config.logLock:
+                logging.error(f"wake_on_LAN_poll_loop: an unknown exception occurred: {e}")
+        await asyncio.sleep(1)
+
+
+def poll_latency():
+    """Begin measuring the latency of every device with an IP address at a regular interval."""
+
+    config.polling_thread_dict["poll_latency"] = c_tools.run_coroutine(latency_sweep_loop())
+
+
+async def latency_sweep_loop():
+    """Run a latency sweep every config.latency_poll_interval seconds."""
+
+    while True:
+        try:
+            await sweep_latency()
+        except Exception as e:
+            print("sweep_latency: an unknown exception occurred", e)
+            with config.logLock:
+                logging.error(f"sweep_latency: an unknown exception occurred: {e}")
+        await asyncio.sleep(max(config.latency_poll_interval - config.latency_sweep_duration, 1))
+
+
+async def sweep_latency():
+    """Ping every known IP address concurrently and record the latency for each device."""
+
+    start_time = time.monotonic()
+
+    # Several components can share an address, so ping each address only once
+    components_by_address: dict[str, list[BaseComponent]] = {}
+    for component in config.componentList + config.projectorList + config.wakeOnLANList:
+        if component.ip_address is None or component.ip_address == "":
+            continue
+        components_by_address.setdefault(component.ip_address, []).append(component)
+
+    # async_multiping expects IP addresses, so resolve any hostnames (e.g., 'localhost') first
+    semaphore = asyncio.Semaphore(config.latency_poll_concurrency)
+
+    async def resolve(address: str) -> str:
+        if not icmplib.is_hostname(address):
+            return address
+        async with semaphore:
+            return (await icmplib.async_resolve(address))[0]
+
+    addresses = list(components_by_address.keys())
+    results = await asyncio.gather(*[resolve(address) for address in addresses], return_exceptions=True)
+
+    components_by_ip: dict[str, list[BaseComponent]] = {}
+    for address, result in zip(addresses, results):
+        components = components_by_address[address]
+        if isinstance(result, BaseException):
+            if not isinstance(result, icmplib.exceptions.NameLookupError):
+                print(f"sweep_latency: error resolving {address}:", result)
+                with config.logLock:
+                    logging.error(f"sweep_latency: error resolving {address}: {result}")
+            for component in components:
+                component.latency = None
+            continue
+        components_by_ip.setdefault(result, []).extend(components)
+
+    hosts = []
+    try:
+        hosts = await icmplib.async_multiping(list(components_by_ip.keys()),
+                                              count=1,
+                                              timeout=1,
+                                              concurrent_tasks=config.latency_poll_concurrency,
+                                              privileged=False)
+    except icmplib.exceptions.SocketPermissionError:
+        if "wakeOnLANPrivilege" not in config.serverWarningDict:
+            config.serverWarningDict["wakeOnLANPrivilege"] = True
+    except Exception as e:
+        print("sweep_latency: an unknown exception occurred", e)
+        with config.logLock:
+            logging.error(f"sweep_latency: an unknown exception occurred: {e}")
+
+    latencies = {host.address: (host.avg_rtt if host.is_alive else None) for host in hosts}
+    for ip, components in components_by_ip.items():
+        for component in components:
+            component.latency = latencies.get(ip, None)
 
-    config.polling_thread_dict["poll_wake_on_LAN_devices"] = threading.Timer(30, poll_wake_on_LAN_devices)
-    config.polling_thread_dict["poll_wake_on_LAN_devices"].daemon = True
-    config.polling_thread_dict["poll_wake_on_LAN_devices"].start()
+    config.latency_sweep_host_count = len(components_by_ip)
+    config.latency_sweep_duration = time.monotonic() - start_time
 
 
 def read_exhibit_configuration(name: str):
@@ -836,7 +1164,7 @@ def read_exhibit_configuration(name: str):
     exhibit_path = c_tools.get_path(["exhibits", name + ".json"], user_file=True)
     config.current_exhibit = os.path.splitext(name)[0]
     config.exhibit_configuration = c_tools.load_json(exhibit_path)
-    config.last_update_time = time.time()
+    c_tools.notify_update("gallery", "components")
 
 
 def update_exhibit_configuration(this_id: str, update: dict[str, Any], exhibit_name: str = ""):
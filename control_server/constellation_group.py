@@ -1,6 +1,5 @@
 # Standard imports
 import datetime
-import time
 from typing import Any
 import uuid
 
@@ -13,7 +12,7 @@ def refresh_last_update():
     """Note that a new group update has occurred."""
 
     config.group_list_last_update_date = datetime.datetime.now().isoformat()
-    config.last_update_time = time.time()
+    c_tools.notify_update("groups")
 
 
 def create_group(name: str, description: str) -> dict[str, Any]:
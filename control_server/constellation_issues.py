@@ -3,7 +3,6 @@ import datetime
 import json
 import logging
 import os
-import time
 from typing import Any, Union
 import uuid
 
@@ -63,7 +62,7 @@ def delete_issue_media_file(files: list[str], owner: Union[str, None] = None) ->
                 issue.details["media"] = [x for x in issue.details["media"] if x != file]
                 issue.refresh_last_update_date()
                 save_issue_list()
-            config.last_update_time = time.time()
+            c_tools.notify_update("issues")
 
 
 def create_issue(details: dict[str, Any], username: str = "") -> Issue:
@@ -74,7 +73,7 @@ def create_issue(details: dict[str, Any], username: str = "") -> Issue:
     with config.issueLock:
         new_issue = Issue(details)
         config.issueList.append(new_issue)
-    config.last_update_time = time.time()
+    c_tools.notify_update("issues")
     return new_issue
 
 
@@ -86,7 +85,7 @@ def edit_issue(details: dict, username: str) -> None:
     with config.issueLock:
         issue.details = issue.details | details
         issue.refresh_last_update_date()
-    config.last_update_time = time.time()
+    c_tools.notify_update("issues")
 
 
 def get_issue(this_id: str) -> Issue:
@@ -108,7 +107,7 @@ def remove_issue(this_id: str) -> None:
             config.issueList = [x for x in config.issueList if x.details["id"] != this_id]
             issue.refresh_last_update_date()
             save_issue_list()
-    config.last_update_time = time.time()
+    c_tools.notify_update("issues")
 
 
 def archive_issue(this_id: str, username: str) -> None:
@@ -140,7 +139,7 @@ def archive_issue(this_id: str, username: str) -> None:
 
         # Then, write the file back to disk
         with open(archive_file, "w", encoding="UTF-8") as file_object:
-            json.dump(archive, file_object, indent=2, sort_keys=True)
+            file_object.write(c_tools.json_dumps(archive, pretty=True))
 
     # Finally, delete the issue
     remove_issue(this_id)
@@ -169,7 +168,7 @@ def restore_issue(this_id: str) -> None:
 
         # Finally, write the file back to disk
         with open(archive_file, "w", encoding="UTF-8") as file_object:
-            json.dump(new_archive, file_object, indent=2, sort_keys=True)
+            file_object.write(c_tools.json_dumps(new_archive, pretty=True))
 
 
 def read_issue_list() -> None:
@@ -198,7 +197,7 @@ def save_issue_list() -> None:
     issue_file = c_tools.get_path(["issues", "issues.json"], user_file=True)
 
     with open(issue_file, "w", encoding="UTF-8") as file_object:
-        json.dump([x.details for x in config.issueList], file_object, indent=2, sort_keys=True)
+        file_object.write(c_tools.json_dumps([x.details for x in config.issueList], pretty=True))
 
 
 # Set up log file
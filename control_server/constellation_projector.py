@@ -1,29 +1,33 @@
 # Standard imports
+import asyncio
 import logging
-import threading
-import time
 
 # Constellation imports
+import component_helpers
 import config
 import constellation_tools as c_tools
-import constellation_exhibit as c_exhibit
 
 
+def poll_projectors():
+    """Begin polling the projectors from the background event loop.
 
+    Each projector is polled according to its own PollingPolicy.
+    """
 
+    config.polling_thread_dict["poll_projectors"] = c_tools.run_coroutine(projector_poll_loop())
 
-def poll_projectors():
-    """Ask each projector to send a status update at an interval.
-    """
 
-    for projector in config.projectorList:
-        new_thread = threading.Thread(target=projector.update, name=f"PollProjector_{projector.id}_{str(time.time())}")
-        new_thread.daemon = True  # So it dies if we exit
-        new_thread.start()
+async def projector_poll_loop():
+    """Poll every projector that is due, checking once per second."""
 
-    config.polling_thread_dict["poll_projectors"] = threading.Timer(5, poll_projectors)
-    config.polling_thread_dict["poll_projectors"].daemon = True
-    config.polling_thread_dict["poll_projectors"].start()
+    while True:
+        try:
+            await component_helpers.poll_due_devices(list(config.projectorList), config.projector_poll_concurrency)
+        except Exception as e:
+            print("projector_poll_loop: an unknown exception occurred", e)
+            with config.logLock:
+                logging.error(f"projector_poll_loop: an unknown exception occurred: {e}")
+        await asyncio.sleep(1)
 
 
 # Set up log file
@@ -1,9 +1,9 @@
 # Standard imports
+import bisect
 import csv
 import datetime
 import json
 import io
-import time
 from typing import Union
 
 import dateutil
@@ -36,43 +36,115 @@ def create_schedule(name: str, entries: dict[str, dict]) -> tuple[bool, dict]:
 
 
 def retrieve_json_schedule():
-    """Build a schedule for the next 21 days based on the available json schedule files and queue today's events"""
+    """Build a schedule for the next 21 days based on the available json schedule files and queue today's events
+
+    Parsed schedule files are cached by modification time and size, so only days whose source file has changed
+    are rebuilt.
+    """
+
+    today = datetime.datetime.today().date()
+    upcoming_days = [today + datetime.timedelta(days=x) for x in range(21)]
 
     with config.scheduleLock:
         config.scheduleUpdateTime = (datetime.datetime.now() - datetime.datetime.utcfromtimestamp(0)).total_seconds()
-        config.json_schedule_list = []
+        previous_days = {day_dict["date"]: day_dict for day_dict in config.json_schedule_list}
+        previous_sources = config.json_schedule_sources
+
+    source_stats = {}
+    with os.scandir(c_tools.get_path(["schedules"], user_file=True)) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                stat = entry.stat()
+                source_stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+    schedule_list = []
+    sources = {}
+    today_schedule_name = None
+    for day in upcoming_days:
+        date_specific_filename = day.isoformat() + ".json"  # e.g., 2021-04-14.json
+        day_specific_filename = day.strftime("%A").lower() + ".json"  # e.g., monday.json
 
-        today = datetime.datetime.today().date()
-        upcoming_days = [today + datetime.timedelta(days=x) for x in range(21)]
+        schedule_to_read = None
+        source = "none"
+        if date_specific_filename in source_stats:
+            schedule_to_read = date_specific_filename
+            source = "date-specific"
+        elif day_specific_filename in source_stats:
+            schedule_to_read = day_specific_filename
+            source = "day-specific"
+        if day == today:
+            today_schedule_name = schedule_to_read
+
+        signature = (schedule_to_read, *source_stats.get(schedule_to_read, ()))
+        sources[day.isoformat()] = signature
+        if previous_sources.get(day.isoformat(), None) == signature and day.isoformat() in previous_days:
+            # Nothing has changed for this day
+            schedule_list.append(previous_days[day.isoformat()])
+            continue
 
-    for day in upcoming_days:
         day_dict = {"date": day.isoformat(),
                     "dayName": day.strftime("%A"),
-                    "source": "none",
+                    "source": source,
                     "schedule": {}}
+        if schedule_to_read is not None:
+            day_dict["schedule"] = load_cached_json_schedule(schedule_to_read, *source_stats[schedule_to_read])
+        schedule_list.append(day_dict)
 
-        date_specific_filename = day.isoformat() + ".json"  # e.g., 2021-04-14.ini
-        day_specific_filename = day.strftime("%A").lower() + ".json"  # e.g., monday.ini
+    with config.scheduleLock:
+        changed = sources != previous_sources
+        config.json_schedule_list = schedule_list
+        config.json_schedule_sources = sources
 
-        sources_to_try = [date_specific_filename, day_specific_filename]
-        source_dir = os.listdir(c_tools.get_path(["schedules"], user_file=True))
-        schedule_to_read = None
+        # Forget files that no longer exist
+        for name in list(config.schedule_file_cache.keys()):
+            if name not in source_stats:
+                del config.schedule_file_cache[name]
 
-        for source in sources_to_try:
-            if source in source_dir:
-                schedule_to_read = source
-                if source == date_specific_filename:
-                    day_dict["source"] = 'date-specific'
-                elif source == day_specific_filename:
-                    day_dict["source"] = 'day-specific'
-                break
+    queue_json_schedule((config.json_schedule_list[0])["schedule"], today_schedule_name)
+    if changed:
+        c_tools.notify_update("schedule")
+
+
+def load_cached_json_schedule(schedule_name: str, mtime: int, size: int) -> dict:
+    """Return the parsed schedule file, reading it only if it has changed since it was last read."""
+
+    with config.scheduleLock:
+        cached = config.schedule_file_cache.get(schedule_name, None)
+    if cached is not None and cached[0] == mtime and cached[1] == size:
+        return cached[2]
+
+    _, schedule = load_json_schedule(schedule_name)
+    schedule = normalize_schedule(schedule)
+    with config.scheduleLock:
+        config.schedule_file_cache[schedule_name] = (mtime, size, schedule)
+    return schedule
 
-        if schedule_to_read is not None:
-            _, day_dict["schedule"] = load_json_schedule(schedule_to_read)
 
-        config.json_schedule_list.append(day_dict)
+def normalize_schedule(schedule: dict | list) -> dict:
+    """Return the schedule with every event's time_in_seconds filled in, sorted by time.
 
-    queue_json_schedule((config.json_schedule_list[0])["schedule"])
+    Events are given time_in_seconds when they are written, so the time is only parsed here for
+    older files that lack it. Events whose time can't be parsed are dropped.
+    """
+
+    if not isinstance(schedule, dict):
+        # check_file_structure() creates the day schedules as empty lists
+        return {}
+
+    events = []
+    for schedule_id, event in schedule.items():
+        if "time_in_seconds" not in event:
+            try:
+                event["time_in_seconds"] = seconds_from_midnight(event["time"])
+            except (KeyError, ValueError):
+                print(f"normalize_schedule: skipping event {schedule_id} with invalid time")
+                continue
+        event.setdefault("target", None)
+        event.setdefault("value", None)
+        events.append((schedule_id, event))
+
+    events.sort(key=lambda x: x[1]["time_in_seconds"])
+    return dict(events)
 
 
 def get_available_date_specific_schedules(all: bool = False) -> list[str]:
@@ -111,7 +183,7 @@ def load_json_schedule(schedule_name: str) -> tuple[bool, dict]:
     with config.scheduleLock:
         try:
             with open(schedule_path, "r", encoding="UTF-8") as f:
-                events = json.load(f)
+                events = c_tools.json_loads(f.read())
         except FileNotFoundError:
             return False, {}
         except json.decoder.JSONDecodeError:
@@ -125,24 +197,45 @@ def load_json_schedule(schedule_name: str) -> tuple[bool, dict]:
 
 
 def write_json_schedule(schedule_name: str, schedule: dict) -> bool:
-    """Take a json schedule dictionary and write it to file"""
+    """Take a normalized json schedule dictionary and write it to file.
+
+    The cached copy of the file, and any of the upcoming days built from it, are updated to match.
+    """
 
     schedule_path = c_tools.get_path(["schedules", schedule_name], user_file=True)
     with config.scheduleLock:
         try:
             with open(schedule_path, "w", encoding="UTF-8") as f:
-                json.dump(schedule, f, indent=2, sort_keys=True)
-            return True
+                f.write(c_tools.json_dumps(schedule, pretty=True))
         except PermissionError:
             print(f"update_json_schedule: cannot open file {schedule_path} for writing. Do you have write permission?")
+            return False
 
-    return False
+        stat = os.stat(schedule_path)
+        config.schedule_file_cache[schedule_name] = (stat.st_mtime_ns, stat.st_size, schedule)
+        dates = [date for date, source in config.json_schedule_sources.items() if source[0] == schedule_name]
+        if len(dates) > 0:
+            for date in dates:
+                config.json_schedule_sources[date] = (schedule_name, stat.st_mtime_ns, stat.st_size)
+            config.json_schedule_list = [{**day_dict, "schedule": schedule} if day_dict["date"] in dates else day_dict
+                                         for day_dict in config.json_schedule_list]
+            config.scheduleUpdateTime = (datetime.datetime.now()
+                                         - datetime.datetime.utcfromtimestamp(0)).total_seconds()
+    return True
+
+
+def is_schedule_in_use(schedule_name: str) -> bool:
+    """Return whether any of the upcoming days is built from the given schedule file."""
+
+    with config.scheduleLock:
+        return any(source[0] == schedule_name for source in config.json_schedule_sources.values())
 
 
 def update_json_schedule(schedule_name: str, updates: dict) -> dict:
     """Write schedule updates to disk and return the updated schedule"""
 
     _, schedule = load_json_schedule(schedule_name)
+    schedule = normalize_schedule(schedule)
 
     # The keys should be the schedule_ids for the items to be updated
     for key in updates:
@@ -159,8 +252,21 @@ def update_json_schedule(schedule_name: str, updates: dict) -> dict:
 
         schedule[key] = update
 
+    schedule = normalize_schedule(schedule)
+    in_use = is_schedule_in_use(schedule_name)
     write_json_schedule(schedule_name, schedule)
-    config.last_update_time = time.time()
+    if not in_use:
+        # A new file may take over some of the upcoming days
+        retrieve_json_schedule()
+        return schedule
+
+    if schedule_name == config.queued_schedule_name:
+        # Adjust today's queued events to match
+        for key in updates:
+            if key in schedule:
+                queue_schedule_event(key, schedule[key])
+        update_next_event()
+    c_tools.notify_update("schedule")
     return schedule
 
 
@@ -168,67 +274,145 @@ def delete_json_schedule_event(schedule_name: str, schedule_id: str) -> dict:
     """Delete the schedule item with the given id"""
 
     _, schedule = load_json_schedule(schedule_name)
+    schedule = normalize_schedule(schedule)
 
     if schedule_id in schedule:
         del schedule[schedule_id]
-        config.last_update_time = time.time()
-
-    write_json_schedule(schedule_name, schedule)
+        write_json_schedule(schedule_name, schedule)
+        if schedule_name == config.queued_schedule_name:
+            unqueue_schedule_event(schedule_id)
+            update_next_event()
+        if is_schedule_in_use(schedule_name):
+            c_tools.notify_update("schedule")
     return schedule
 
 
-def queue_json_schedule(schedule: dict) -> None:
-    """Take a schedule dict and create a timer to execute it"""
+def queue_json_schedule(schedule: dict, schedule_name: Union[str, None] = None) -> None:
+    """Queue today's events from the given schedule dict on the shared timer queue.
+
+    Events that are already queued unchanged keep their timers, so only the differences are applied.
+    """
+
+    config.queued_schedule_name = schedule_name
+
+    with config.scheduleLock:
+        queued_ids = list(config.schedule_timers.keys())
+    for schedule_id in queued_ids:
+        if schedule_id not in schedule:
+            unqueue_schedule_event(schedule_id)
+    for schedule_id, event in schedule.items():
+        queue_schedule_event(schedule_id, event)
+    update_next_event()
+
+    now = datetime.datetime.now()
+    with config.scheduleLock:
+        # Add a timer to reboot the server
+        if config.schedule_reboot_timer is not None:
+            config.schedule_reboot_timer.cancel()
+            config.schedule_reboot_timer = None
+        if config.serverRebootTime is not None:
+            seconds_until_reboot = (config.serverRebootTime - now).total_seconds()
+            if seconds_until_reboot >= 0:
+                config.schedule_reboot_timer = c_tools.timer_queue.call_later(seconds_until_reboot,
+                                                                              start_schedule_thread,
+                                                                              c_tools.reboot_server)
+
+        # Add a timer to reload the schedule
+        if config.schedule_reload_timer is not None:
+            config.schedule_reload_timer.cancel()
+        midnight = datetime.datetime.combine(now + datetime.timedelta(days=1), datetime.time.min)
+        config.schedule_reload_timer = c_tools.timer_queue.call_later((midnight - now).total_seconds(),
+                                                                      start_schedule_thread,
+                                                                      retrieve_json_schedule)
+
+
+def queue_schedule_event(schedule_id: str, event: dict) -> None:
+    """Queue a timer for the given event, replacing any existing timer for the same schedule ID.
+
+    Notes and events that have already passed are not queued.
+    """
+
+    with config.scheduleLock:
+        existing = config.schedule_timers.get(schedule_id, None)
+        if existing is not None:
+            if existing[1] == event:
+                return
+            pop_queued_event(schedule_id)
 
-    new_timers = []
-    config.json_next_event = []
-    for key in schedule:
-        event = schedule[key]
         if event["action"] == "note":
             # Don't queue notes
-            continue
-        event_time = dateutil.parser.parse(event["time"])
+            return
+
+        midnight = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+        event_time = midnight + datetime.timedelta(seconds=event["time_in_seconds"])
         seconds_from_now = (event_time - datetime.datetime.now()).total_seconds()
-        if seconds_from_now >= 0:
-
-            # Check if this is the next event
-            if len(config.json_next_event) == 0:
-                config.json_next_event.append(event)
-            elif event["time_in_seconds"] < (config.json_next_event[0])["time_in_seconds"]:
-                config.json_next_event = [event]
-            elif event["time_in_seconds"] == (config.json_next_event[0])["time_in_seconds"]:
-                config.json_next_event.append(event)
-
-            # print("scheduling timer: ", event)
-            timer = threading.Timer(seconds_from_now,
-                                    execute_scheduled_action,
-                                    args=(event["action"], event["target"], event["value"]))
-            timer.daemon = True
-            timer.start()
-            new_timers.append(timer)
-
-    # Add timer to reboot the server
-    if config.serverRebootTime is not None:
-        seconds_until_reboot = (config.serverRebootTime - datetime.datetime.now()).total_seconds()
-        if seconds_until_reboot >= 0:
-            timer = threading.Timer(seconds_until_reboot, c_tools.reboot_server)
-            timer.daemon = True
-            timer.start()
-            new_timers.append(timer)
-
-    # Add a timer to reload the schedule
-    midnight = datetime.datetime.combine(datetime.datetime.now() + datetime.timedelta(days=1), datetime.time.min)
-    seconds_until_midnight = (midnight - datetime.datetime.now()).total_seconds()
-    timer = threading.Timer(seconds_until_midnight, retrieve_json_schedule)
-    timer.daemon = True
-    timer.start()
-    new_timers.append(timer)
-
-    # Stop the existing timers and switch to our new ones
+        if seconds_from_now < 0:
+            return
+
+        timer = c_tools.timer_queue.call_later(seconds_from_now, run_schedule_event, schedule_id)
+        config.schedule_timers[schedule_id] = (timer, event.copy())
+        bisect.insort(config.schedule_queue, (event["time_in_seconds"], schedule_id))
+
+
+def unqueue_schedule_event(schedule_id: str) -> None:
+    """Cancel the timer for the given schedule ID, if there is one."""
+
     with config.scheduleLock:
-        for timer in config.schedule_timers:
-            timer.cancel()
-        config.schedule_timers = new_timers
+        pop_queued_event(schedule_id)
+
+
+def pop_queued_event(schedule_id: str, cancel: bool = True) -> Union[dict, None]:
+    """Remove the given event from today's queue and return it. The caller must hold config.scheduleLock."""
+
+    queued = config.schedule_timers.pop(schedule_id, None)
+    if queued is None:
+        return None
+    timer, event = queued
+    if cancel:
+        timer.cancel()
+
+    index = bisect.bisect_left(config.schedule_queue, (event["time_in_seconds"], schedule_id))
+    del config.schedule_queue[index]
+    return event
+
+
+def get_queued_events(start: float, end: float) -> list[dict]:
+    """Return today's queued events from start to end seconds after midnight, inclusive, in time order."""
+
+    with config.scheduleLock:
+        low = bisect.bisect_left(config.schedule_queue, start, key=lambda x: x[0])
+        high = bisect.bisect_right(config.schedule_queue, end, key=lambda x: x[0])
+        return [config.schedule_timers[schedule_id][1] for _, schedule_id in config.schedule_queue[low:high]]
+
+
+def update_next_event() -> None:
+    """Set config.json_next_event to the queued events that will happen soonest."""
+
+    with config.scheduleLock:
+        if len(config.schedule_queue) == 0:
+            config.json_next_event = []
+            return
+        next_time = config.schedule_queue[0][0]
+    config.json_next_event = get_queued_events(next_time, next_time)
+
+
+def run_schedule_event(schedule_id: str) -> None:
+    """Called from the timer queue when an event is due."""
+
+    with config.scheduleLock:
+        event = pop_queued_event(schedule_id, cancel=False)
+    if event is None:
+        return
+    update_next_event()
+
+    start_schedule_thread(execute_scheduled_action, event["action"], event["target"], event["value"])
+
+
+def start_schedule_thread(target, *args) -> None:
+    """Run the target in its own thread so that the timer queue isn't blocked."""
+
+    thread = threading.Thread(target=target, args=args, name="Scheduled action", daemon=True)
+    thread.start()
 
 
 def convert_schedule_to_csv(schedule_name: str) -> tuple[bool, str]:
@@ -279,7 +463,7 @@ def convert_schedule_to_csv(schedule_name: str) -> tuple[bool, str]:
 def execute_scheduled_action(action: str, target: Union[list, str, None], value: Union[list, str, None]):
     """Dispatch the appropriate action when called by a schedule timer"""
 
-    config.last_update_time = time.time()
+    c_tools.notify_update()
     if action == 'set_definition' and target is not None and value is not None:
         if isinstance(value, list):
             value = value[0]
@@ -312,15 +496,13 @@ def execute_scheduled_action(action: str, target: Union[list, str, None], value:
                 c_exhibit.command_all_exhibit_components(action)
             elif target_i.startswith("__group"):
                 group = target_i[8:]
-                for component in config.componentList:
-                    if component.group == group:
-                        component.queue_command(action)
-                for component in config.projectorList:
-                    if component.group == group:
-                        component.queue_command(action)
-                for component in config.wakeOnLANList:
-                    if component.group == group:
-                        component.queue_command(action)
+                if group not in config.groupIndex:
+                    # Older schedules name the group instead of giving its uuid
+                    for details in config.group_list:
+                        if details.get("name", None) == group:
+                            group = details["uuid"]
+                            break
+                c_exhibit.command_components(c_exhibit.get_group_components(group), action)
             elif target_i.startswith("__id"):
                 c_exhibit.get_exhibit_component(component_id=target_i[5:]).queue_command(action)
     else:
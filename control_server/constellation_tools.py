@@ -1,21 +1,426 @@
 """Helper functions for Control Server."""
 
 # Standard imports
+import asyncio
+import collections
+import concurrent.futures
+import datetime
+import heapq
 import json
 import logging
 import os
+import secrets
 import sys
 import threading
+import time
 import _thread
-from typing import Any, Union
+from typing import Any, Awaitable, Callable, Union
 
 # Non-standard imports
+import httpx
 import psutil
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library json module
+    orjson = None
 
 # Constellation imports
 import config
 
 
+class TimerHandle:
+    """A callback that has been scheduled on a TimerQueue."""
+
+    def __init__(self, queue: 'TimerQueue', when: float, callback: Callable, args: tuple):
+        self.queue = queue
+        self.when = when  # In terms of time.monotonic()
+        self.callback = callback
+        self.args = args
+        self.cancelled: bool = False
+        self.fired: bool = False  # Set once the queue has removed the handle to run its callback
+
+    def __lt__(self, other: 'TimerHandle') -> bool:
+        return self.when < other.when
+
+    def cancel(self):
+        """Prevent the callback from running, if it has not already."""
+
+        self.queue.cancel(self)
+
+
+class TimerQueue:
+    """Run callbacks at scheduled times from a single background thread.
+
+    Use this instead of starting a threading.Timer for every delayed action. Callbacks run on the
+    queue's thread, so they should return quickly.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.heap: list[TimerHandle] = []
+        self.num_cancelled: int = 0
+        self.condition = threading.Condition()
+        self.thread: Union[threading.Thread, None] = None
+
+    def __len__(self):
+        return len(self.heap) - self.num_cancelled
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        """Schedule callback(*args) to run after delay seconds and return a handle to cancel it."""
+
+        handle = TimerHandle(self, time.monotonic() + delay, callback, args)
+        with self.condition:
+            heapq.heappush(self.heap, handle)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+            if self.heap[0] is handle:
+                # The next deadline has moved earlier, so wake the thread to recalculate its wait.
+                self.condition.notify()
+        return handle
+
+    def cancel(self, handle: TimerHandle):
+        """Cancel the given handle."""
+
+        with self.condition:
+            if handle.cancelled or handle.fired:
+                # The handle is no longer in the heap
+                return
+            handle.cancelled = True
+            self.num_cancelled += 1
+
+            # Cancelled handles are normally discarded when they reach the front of the heap, but
+            # if they make up most of it, rebuild it so that memory doesn't grow without bound.
+            if self.num_cancelled > 64 and self.num_cancelled > len(self.heap) / 2:
+                self.heap = [x for x in self.heap if not x.cancelled]
+                heapq.heapify(self.heap)
+                self.num_cancelled = 0
+
+    def run(self):
+        """Wait for each deadline in turn and run its callback."""
+
+        while True:
+            with self.condition:
+                while True:
+                    if len(self.heap) > 0 and self.heap[0].cancelled:
+                        heapq.heappop(self.heap)
+                        self.num_cancelled -= 1
+                        continue
+                    if len(self.heap) == 0:
+                        self.condition.wait()
+                        continue
+                    delay = self.heap[0].when - time.monotonic()
+                    if delay <= 0:
+                        handle = heapq.heappop(self.heap)
+                        handle.fired = True
+                        break
+                    self.condition.wait(delay)
+
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"{self.name}: error running {handle.callback}:", e)
+                with config.logLock:
+                    logging.error(f"{self.name}: error running {handle.callback}: {e}")
+
+
+class WriteBehindQueue:
+    """Write JSON files shortly after they are requested, coalescing repeated writes of the same file.
+
+    Each file is written atomically, so a crash leaves either the old or the new version on disk.
+    A file that fails to write is retried on later flushes, up to max_attempts times.
+    """
+
+    def __init__(self, name: str, delay: float, max_attempts: int = 5):
+        self.name = name
+        self.delay = delay  # Seconds to wait for further changes before writing
+        self.max_attempts = max_attempts
+        self.pending: dict[str, Callable[[], Any]] = {}  # Path: function returning the data to write
+        self.failures: dict[str, int] = {}  # Path: number of failed writes in a row
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # Held while files are being written
+        self.timer: Union[TimerHandle, None] = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def schedule(self, path: str, get_data: Callable[[], Any]):
+        """Write the result of get_data() to path after a short delay.
+
+        get_data is called when the write happens, so it should return the current state.
+        """
+
+        with self.lock:
+            self.pending[path] = get_data
+            self.failures.pop(path, None)
+            if self.timer is None:
+                self.timer = timer_queue.call_later(self.delay, self.start_flush)
+
+    def discard(self, path: str):
+        """Cancel any pending write for the given path.
+
+        Waits for a write that is in progress, so the file may be deleted safely afterwards.
+        """
+
+        with self.flush_lock:
+            with self.lock:
+                self.pending.pop(path, None)
+                self.failures.pop(path, None)
+
+    def start_flush(self):
+        """Flush from a separate thread so that the timer queue isn't blocked by disk access."""
+
+        with self.lock:
+            # This timer has fired, so a later schedule() should start a new one
+            self.timer = None
+        threading.Thread(target=self.flush, name=self.name, daemon=True).start()
+
+    def flush(self):
+        """Write every pending file now."""
+
+        with self.flush_lock:
+            with self.lock:
+                pending = self.pending
+                self.pending = {}
+                if self.timer is not None:
+                    # A timer that is still waiting has nothing left to do
+                    self.timer.cancel()
+                    self.timer = None
+
+            failed = {}
+            for path, get_data in pending.items():
+                try:
+                    write_text_atomic(json_dumps(get_data(), pretty=True), path)
+                except Exception as e:
+                    print(f"{self.name}: error writing {path}:", e)
+                    with config.logLock:
+                        logging.error(f"{self.name}: error writing {path}: {e}")
+                    failed[path] = get_data
+                else:
+                    with self.lock:
+                        self.failures.pop(path, None)
+
+            if len(failed) > 0:
+                # Try again later, unless the file has been scheduled again in the meantime
+                with self.lock:
+                    for path, get_data in failed.items():
+                        if path in self.pending:
+                            continue
+                        self.failures[path] = self.failures.get(path, 0) + 1
+                        if self.failures[path] >= self.max_attempts:
+                            del self.failures[path]
+                            print(f"{self.name}: giving up on {path} after {self.max_attempts} failed writes")
+                            with config.logLock:
+                                logging.error(f"{self.name}: giving up on {path} after {self.max_attempts} failed writes")
+                            continue
+                        self.pending[path] = get_data
+                    if len(self.pending) > 0 and self.timer is None:
+                        self.timer = timer_queue.call_later(self.delay, self.start_flush)
+
+
+class CommandExecutor:
+    """Run device commands on the background event loop.
+
+    Commands for one device run one at a time, in the order they were queued, and at most concurrency()
+    commands run at once across all devices. A command queued while another with the same coalesce key is
+    still waiting replaces it, so power_on followed by power_off only sends power_off.
+    """
+
+    def __init__(self, name: str, concurrency: Callable[[], int]):
+        self.name = name
+        self.concurrency = concurrency
+        # Device key: {coalesce key: (command, function returning the coroutine to run, time queued)}
+        self.pending: dict[str, dict[str, tuple[str, Callable[[], Awaitable], float]]] = {}
+        self.lock = threading.Lock()
+
+        # Only used from the event loop
+        self.workers: dict[str, asyncio.Task] = {}
+        self.semaphore: Union[asyncio.Semaphore, None] = None
+        self.running: int = 0
+
+        # Command: recent (seconds waiting in the queue, seconds running)
+        self.latencies: dict[str, collections.deque] = {}
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(queue) for queue in self.pending.values())
+
+    def submit(self, device_key: str, command: str, run: Callable[[], Awaitable],
+               coalesce_key: Union[str, None] = None):
+        """Queue run() to be awaited once the device is free. This is safe to call from any thread."""
+
+        if coalesce_key is None:
+            coalesce_key = command
+
+        with self.lock:
+            queue = self.pending.setdefault(device_key, {})
+            queue.pop(coalesce_key, None)  # The replacement goes to the back of the queue
+            queue[coalesce_key] = (command, run, time.monotonic())
+        get_event_loop().call_soon_threadsafe(self.start_worker, device_key)
+
+    def start_worker(self, device_key: str):
+        if device_key not in self.workers:
+            self.workers[device_key] = get_event_loop().create_task(self.run_device(device_key),
+                                                                    name=f"{self.name} {device_key}")
+
+    async def run_device(self, device_key: str):
+        """Run the device's queued commands until there are none left."""
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency())
+
+        try:
+            while True:
+                with self.lock:
+                    queue = self.pending.get(device_key, {})
+                    if len(queue) == 0:
+                        self.pending.pop(device_key, None)
+                        return
+                    command, run, queued_time = queue.pop(next(iter(queue)))
+
+                async with self.semaphore:
+                    start = time.monotonic()
+                    self.running += 1
+                    try:
+                        await run()
+                    except Exception as e:
+                        print(f"{self.name}: error running {command} for {device_key}:", e)
+                        with config.logLock:
+                            logging.error(f"{self.name}: error running {command} for {device_key}: {e}")
+                    finally:
+                        self.running -= 1
+                    samples = self.latencies.setdefault(command, collections.deque(maxlen=100))
+                    samples.append((start - queued_time, time.monotonic() - start))
+        finally:
+            del self.workers[device_key]
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Return the queue depth and the recent latency of each command, in seconds."""
+
+        commands = {}
+        for command, samples in list(self.latencies.items()):
+            samples = list(samples)
+            commands[command] = {
+                "count": len(samples),
+                "mean_wait": sum(x[0] for x in samples) / len(samples),
+                "mean_duration": sum(x[1] for x in samples) / len(samples),
+                "max_duration": max(x[1] for x in samples)
+            }
+        return {"queue_depth": len(self), "running": self.running, "commands": commands}
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop used for asynchronous network tasks, starting it if necessary."""
+
+    with config.eventLoopLock:
+        if config.event_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="Constellation event loop", daemon=True)
+            thread.start()
+            config.event_loop = loop
+
+    return config.event_loop
+
+
+def run_coroutine(coro) -> concurrent.futures.Future:
+    """Schedule the coroutine on the background event loop and return a Future for its result.
+
+    This is safe to call from any thread.
+    """
+
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client used to contact helpers, creating it if necessary.
+
+    Connections to each helper are kept alive between requests. This must only be called from the
+    background event loop.
+    """
+
+    if config.http_client is None:
+        config.http_client = httpx.AsyncClient(timeout=httpx.Timeout(config.helper_command_timeout, connect=2),
+                                               limits=httpx.Limits(max_connections=100,
+                                                                   max_keepalive_connections=50))
+    return config.http_client
+
+
+async def http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request with the shared HTTP client and return the response.
+
+    Requests that fail to connect are retried up to config.helper_command_retries times with an increasing
+    delay. Requests that may have reached the server are not retried, since commands like shutdown must
+    only be sent once. This must run on the background event loop.
+    """
+
+    attempt = 0
+    while True:
+        try:
+            return await get_http_client().request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if attempt >= config.helper_command_retries:
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            attempt += 1
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client's connections. This must run on the background event loop."""
+
+    if config.http_client is not None:
+        client = config.http_client
+        config.http_client = None
+        await client.aclose()
+
+
+def notify_update(*sections: str) -> None:
+    """Record that the given sections of the server state have changed and wake any tasks waiting for an update.
+
+    Sections are those in config.update_sections. With no sections given, every section is marked as changed.
+    This is safe to call from any thread.
+    """
+
+    if len(sections) == 0:
+        sections = config.update_sections
+
+    with config.updateWaitersLock:
+        for section in sections:
+            config.section_versions[section] += 1
+        config.last_update_time = time.time()
+        config.update_sequence += 1
+        waiters = config.update_waiters
+        config.update_waiters = []
+
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(wake_waiter, future)
+        except RuntimeError:
+            # The loop has been closed
+            pass
+
+
+def wake_waiter(future: asyncio.Future) -> None:
+    """Resolve a future registered by wait_for_update(), if it is still pending."""
+
+    if not future.done():
+        future.set_result(None)
+
+
+async def wait_for_update(last_sequence: int) -> None:
+    """Wait until config.update_sequence differs from the given value."""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        future = loop.create_future()
+        with config.updateWaitersLock:
+            # Check under the lock so that a notification can't slip in before we are registered
+            if config.update_sequence != last_sequence:
+                return
+            config.update_waiters.append((loop, future))
+        await future
+
+
 def get_path(path_list: list[str], user_file: bool = False) -> str:
     """Return a path that takes into account whether the app has been packaged by Pyinstaller"""
 
@@ -33,6 +438,42 @@ def clear_terminal() -> None:
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
+def json_default(obj: Any) -> Any:
+    """Convert objects that JSON cannot represent directly, formatting dates the same way orjson does."""
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def json_dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is available.
+
+    Set pretty=True for indented output with sorted keys, as used for files on disk.
+    """
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=json_default, option=option).decode('UTF-8')
+
+    if pretty:
+        return json.dumps(obj, default=json_default, indent=2, sort_keys=True)
+    return json.dumps(obj, default=json_default, separators=(',', ':'))
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON string, using orjson when it is available.
+
+    Both parsers raise a subclass of json.JSONDecodeError for invalid input.
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def load_json(path: str):
     """Load the requested JSON file from disk and return it as a dictionary."""
 
@@ -44,23 +485,50 @@ def load_json(path: str):
     with config.galleryConfigurationLock:
         with open(path, 'r', encoding='UTF-8') as f:
             try:
-                result = json.load(f)
+                result = json_loads(f.read())
             except json.decoder.JSONDecodeError:
                 result = None
             return result
 
 
+def write_text_atomic(text: str, path: str) -> None:
+    """Write text to path by way of a temporary file, so that the file is never left half-written."""
+
+    directory, filename = os.path.split(path)
+    # The leading dot means load_components() and similar will skip any leftover temporary file
+    temp_path = os.path.join(directory, "." + filename + "." + secrets.token_hex(4) + ".tmp")
+    # Opening with 0o666 lets the OS apply the umask, giving a new file the mode it would usually have
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, 'w', encoding='UTF-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # Keep the mode of the file being replaced
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
 def write_json(data, path: str, append: bool = False) -> None:
     """Take the given object and try to write it to a JSON file."""
 
-    if append:
-        mode = 'a'
-    else:
-        mode = 'w'
+    text = json_dumps(data, pretty=True)
 
     with config.galleryConfigurationLock:
-        with open(path, mode, encoding='UTF-8') as f:
-            json.dump(data, f, indent=2, sort_keys=True)
+        if append:
+            with open(path, 'a', encoding='UTF-8') as f:
+                f.write(text)
+        else:
+            write_text_atomic(text, path)
 
 
 def load_system_configuration(from_dict: Union[dict[str, Any], None] = None) -> None:
@@ -77,6 +545,23 @@ def load_system_configuration(from_dict: Union[dict[str, Any], None] = None) ->
     config.ip_address = system.get("ip_address", "localhost")
     config.gallery_name = system.get("gallery_name", "")
     config.debug = system.get("debug", False)
+    config.latency_poll_interval = system.get("latency_poll_interval", 10)
+    config.latency_poll_concurrency = system.get("latency_poll_concurrency", 50)
+    config.projector_poll_interval = system.get("projector_poll_interval", 5)
+    config.projector_poll_concurrency = system.get("projector_poll_concurrency", 20)
+    config.projector_poll_timeout = system.get("projector_poll_timeout", 4)
+    config.projector_command_concurrency = system.get("projector_command_concurrency", 10)
+    config.helper_command_concurrency = system.get("helper_command_concurrency", 20)
+    config.helper_command_timeout = system.get("helper_command_timeout", 5)
+    config.helper_command_retries = system.get("helper_command_retries", 2)
+    config.argon2_time_cost = system.get("argon2_time_cost", 1)
+    config.argon2_memory_cost = system.get("argon2_memory_cost", 1024)
+    config.argon2_parallelism = system.get("argon2_parallelism", 1)
+    config.argon2_workers = system.get("argon2_workers", 2)
+    config.projector_poll_max_interval = system.get("projector_poll_max_interval", 60)
+    config.wol_poll_interval = system.get("wol_poll_interval", 30)
+    config.wol_poll_max_interval = system.get("wol_poll_max_interval", 300)
+    config.wol_poll_concurrency = system.get("wol_poll_concurrency", 50)
 
     if config.debug:
         logging.getLogger('uvicorn').setLevel(logging.DEBUG)
@@ -92,6 +577,7 @@ def update_system_configuration(update: dict[str, Any]) -> None:
     write_json(new_config, system_path)
 
     load_system_configuration(from_dict=new_config)
+    notify_update("gallery")
 
 
 def reboot_server(*args, **kwargs) -> None:
@@ -122,6 +608,7 @@ def print_debug_details() -> None:
     print(f"Active threads: {threading.active_count()}")
     print([x.name for x in threading.enumerate()])
     print(f"Memory used: {psutil.Process().memory_info().rss/1024/1024} Mb")
+    print(f"Latency sweep: {config.latency_sweep_host_count} hosts in {round(config.latency_sweep_duration, 3)} s")
     print("=================================================", flush=True)
 
     timer = threading.Timer(10, print_debug_details)
@@ -206,3 +693,13 @@ def with_extension(filename: str, ext: str) -> str:
         ext = ext[1:]
 
     return os.path.splitext(filename)[0] + "." + ext
+
+
+# Shared queue for delayed actions
+timer_queue = TimerQueue("Constellation timers")
+
+# Shared queue for component files and other frequently rewritten JSON
+write_behind_queue = WriteBehindQueue("Constellation file writer", config.write_behind_delay)
+
+# Shared executor for projector commands
+command_executor = CommandExecutor("Projector commands", lambda: config.projector_command_concurrency)
@@ -1,7 +1,10 @@
 # Standard modules
+import asyncio
+import concurrent.futures
 import datetime
 import os.path
-from typing import Any
+import time
+from typing import Any, Callable
 import uuid
 
 # Non-standard modules
@@ -12,11 +15,13 @@ from cryptography.fernet import Fernet, InvalidToken
 import config
 import constellation_tools as c_tools
 
-password_hasher = argon2.PasswordHasher(time_cost=1,
-                                        memory_cost=1024,
-                                        parallelism=1,
-                                        hash_len=24,
-                                        type=argon2.Type.ID)
+PERMISSION_LEVELS = {"none": 0, "view": 1, "edit": 2}
+# The component permission lists that grant each level
+COMPONENT_PERMISSION_LEVELS = {
+    "edit": ("edit",),
+    "edit_content": ("edit", "edit_content"),
+    "view": ("edit", "edit_content", "view")
+}
 
 
 class User:
@@ -27,7 +32,8 @@ class User:
                  display_name: str,
                  password_hash: str,
                  permissions_dict: dict | None = None,
-                 uuid_str: str = ""):
+                 uuid_str: str = "",
+                 last_activity: str | None = None):
         """Create a new User"""
 
         if permissions_dict is None:
@@ -44,85 +50,111 @@ class User:
                 "settings": "none",
                 "users": "none"
             }
+        if uuid_str == "":
+            self.uuid = str(uuid.uuid4())
+        else:
+            self.uuid = uuid_str
+
         self.username = username
         self.display_name = display_name
         self.password_hash = password_hash
         self.permissions = permissions_dict
-        self.last_activity = datetime.datetime.now().isoformat()
+        if last_activity is None:
+            last_activity = datetime.datetime.now().isoformat()
+        self.last_activity = last_activity
 
-        if uuid_str == "":
-            self.uuid = str(uuid.uuid4())
-        else:
-            self.uuid = uuid_str
+    @property
+    def username(self) -> str:
+        return self._username
+
+    @username.setter
+    def username(self, username: str):
+        """Set the username, updating the registry if this user is in it."""
+
+        if config.userIndex["uuid"].get(self.uuid, None) is self:
+            config.userIndex["username"].pop(self._username.lower(), None)
+            config.userIndex["username"][username.lower()] = self
+        self._username = username
 
     def authenticate(self, password: str) -> bool:
-        try:
-            result = password_hasher.verify(self.password_hash, password)
+        result = verify_password(self.password_hash, password)
+        if result:
             self.update_last_activity()
-        except argon2.exceptions.VerificationError:
-            result = False
         return result
 
+    async def async_authenticate(self, password: str) -> bool:
+        result = await async_verify_password(self.password_hash, password)
+        if result:
+            self.update_last_activity()
+        return result
+
+    @property
+    def permissions(self) -> dict:
+        return self._permissions
+
+    @permissions.setter
+    def permissions(self, permissions_dict: dict):
+        """Set the permissions and compile them for fast checking.
+
+        Assign a new dictionary rather than editing the existing one, so that the compiled sets stay current.
+        """
+
+        self._permissions = permissions_dict
+
+        self.action_levels: dict[str, int] = {action: PERMISSION_LEVELS.get(level, 0)
+                                              for action, level in permissions_dict.items()
+                                              if action != "components"}
+
+        # For each needed level, the groups (or "__all") that grant it
+        components = permissions_dict.get("components", {})
+        self.component_groups: dict[str, frozenset[str]] = {
+            needed_level: frozenset(group for level in granting for group in components.get(level, []))
+            for needed_level, granting in COMPONENT_PERMISSION_LEVELS.items()
+        }
+
     def check_permission(self, action, needed_level, groups: list[str] | None = None) -> bool:
         """Check if the user has sufficient permission to perform an action"""
 
         self.update_last_activity()
+        return self.has_permission(action, needed_level, groups=groups)
+
+    def has_permission(self, action, needed_level, groups: list[str] | None = None) -> bool:
+        """Check the user's permission like check_permission(), without counting it as activity."""
 
         if needed_level == "none":
             return True
 
         if action != "components":
-            allowed_level = self.permissions.get(action, "none")
-            if needed_level == "edit":
-                if allowed_level == "edit":
-                    return True
-                return False
-            if needed_level == "view":
-                if allowed_level == "edit" or allowed_level == "view":
-                    return True
-                return False
-        if action == 'components':
-            if needed_level == "edit":
-                if "__all" in self.permissions["components"].get("edit", []):
-                    return True
-                if groups is not None:
-                    # We match if any of the provided groups matches any of the allowed groups
-                    match = False
-                    for group in groups:
-                        if group in self.permissions["components"].get("edit", []):
-                            match = True
-                    return match
-                return False
-            if needed_level == "edit_content":
-                if "__all" in self.permissions["components"].get("edit", []) or \
-                        "__all" in self.permissions["components"].get("edit_content", []):
-                    return True
-                if groups is not None:
-                    # We match if any of the provided groups matches any of the allowed groups
-                    match = False
-                    for group in groups:
-                        if group in self.permissions["components"].get("edit", []) or \
-                                group in self.permissions["components"].get("edit_content", []):
-                            match = True
-                    return match
-                return False
-            if needed_level == "view":
-                if "__all" in self.permissions["components"].get("edit", []) or \
-                        "__all" in self.permissions["components"].get("edit_content", []) or \
-                        "__all" in self.permissions["components"].get("view", []):
-                    return True
-                if groups is not None:
-                    # We match if any of the provided groups matches any of the allowed groups
-                    match = False
-                    for group in groups:
-                        if group in self.permissions["components"].get("edit", []) or \
-                                group in self.permissions["components"].get("edit_content", []) or \
-                                group in self.permissions["components"].get("view", []):
-                            match = True
-                    return match
+            if needed_level not in ("edit", "view"):
                 return False
+            return self.action_levels.get(action, 0) >= PERMISSION_LEVELS[needed_level]
+
+        allowed = self.component_groups.get(needed_level, None)
+        if allowed is None:
+            return False
+        if "__all" in allowed:
+            return True
+        if groups is not None:
+            # We match if any of the provided groups matches any of the allowed groups
+            return not allowed.isdisjoint(groups)
         return False
 
+    def filter_groups(self, groups: list[str], needed_level: str = "view") -> list[str]:
+        """Return the groups for which the user has the needed level of component permission."""
+
+        allowed = self.component_groups.get(needed_level, frozenset())
+        if "__all" in allowed:
+            return list(groups)
+        return [group for group in groups if group in allowed]
+
+    def filter_components(self, components: list, needed_level: str = "view") -> list:
+        """Return the components for which the user has the needed level of permission."""
+
+        allowed = self.component_groups.get(needed_level, frozenset())
+        if "__all" in allowed:
+            return list(components)
+        return [component for component in components if not allowed.isdisjoint(component.groups)]
+
     def get_dict(self, omit_password: bool = True) -> dict:
         """Return a JSON representation of this user."""
 
@@ -139,9 +171,15 @@ class User:
         return this_dict
 
     def update_last_activity(self):
-        """Set the last activity time ot now."""
+        """Set the last activity time ot now.
+
+        The change is kept in memory and saved by the next flush_user_activity().
+        """
 
         self.last_activity = datetime.datetime.now().isoformat()
+        if self.uuid != "admin":
+            # The root admin isn't stored in users.json
+            config.user_activity_dirty = True
 
 
 def get_encryption_key() -> bytes:
@@ -163,32 +201,88 @@ def get_encryption_key() -> bytes:
     return config.encryption_key
 
 
+def get_fernet() -> Fernet:
+    """Return the shared Fernet instance, rebuilding it if the encryption key has changed."""
+
+    key = get_encryption_key()
+    if config.fernet is None or config.fernet_key != key:
+        config.fernet = Fernet(key)
+        config.fernet_key = key
+        # Tokens made with the old key are no longer valid
+        clear_token_cache()
+    return config.fernet
+
+
 def encrypt_token(uuid_str: str) -> str:
     """Encrypt the uuid as a token and return it."""
 
-    f = Fernet(get_encryption_key())
-    token = f.encrypt(bytes(uuid_str, 'UTF-8'))
+    token = get_fernet().encrypt(bytes(uuid_str, 'UTF-8'))
     return str(token, 'UTF-8')
 
 
 def decrypt_token(token: str) -> str:
     """Decrypt a token and return the uuid."""
 
-    f = Fernet(get_encryption_key())
-    uuid_str = f.decrypt(token)
+    uuid_str = get_fernet().decrypt(token)
     return str(uuid_str, 'UTF-8')
 
 
+def get_cached_token(token: str) -> str | None:
+    """Return the user uuid for a recently authenticated token, or None if it isn't cached."""
+
+    with config.tokenCacheLock:
+        cached = config.token_cache.get(token, None)
+        if cached is None:
+            return None
+        if cached[1] < time.monotonic():
+            del config.token_cache[token]
+            return None
+        config.token_cache.move_to_end(token)
+        return cached[0]
+
+
+def cache_token(token: str, uuid_str: str):
+    """Remember that the token belongs to the given user, dropping the least recently used token if full."""
+
+    with config.tokenCacheLock:
+        config.token_cache[token] = (uuid_str, time.monotonic() + config.token_cache_ttl)
+        config.token_cache.move_to_end(token)
+        while len(config.token_cache) > config.token_cache_size:
+            config.token_cache.popitem(last=False)
+
+
+def invalidate_user_tokens(uuid_str: str):
+    """Forget the cached tokens for the given user, e.g., because their account has changed."""
+
+    with config.tokenCacheLock:
+        for token in [x for x, cached in config.token_cache.items() if cached[0] == uuid_str]:
+            del config.token_cache[token]
+
+
+def clear_token_cache():
+    """Forget every cached token."""
+
+    with config.tokenCacheLock:
+        config.token_cache.clear()
+
+
 def create_root_admin(password: str):
     """Create the root admin by saving a hashed password to disk. """
 
-    path = c_tools.get_path(["configuration", "root_admin.txt"], user_file=True)
+    save_root_admin(hash_password(password))
+
+
+def save_root_admin(password_hash: str):
+    """Write the root admin's password hash to disk."""
 
-    password_hash = hash_password(password)
+    path = c_tools.get_path(["configuration", "root_admin.txt"], user_file=True)
 
     with config.galleryConfigurationLock:
         with open(path, 'w', encoding='UTF-8') as f:
             f.write(password_hash)
+    # Reload the admin account on next use, even if the mtime happens to match
+    config.admin_file_mtime = None
+    invalidate_user_tokens("admin")
 
 
 def check_for_root_admin():
@@ -227,32 +321,66 @@ def check_for_root_admin():
 def load_users():
     """Read users.json and build a User for each."""
 
-    config.user_list = []  # Clear existing users
+    # Clear existing users
+    config.user_list = []
+    config.userIndex = {"uuid": {}, "username": {}}
 
     path = c_tools.get_path(["configuration", "users.json"], user_file=True)
 
     users = c_tools.load_json(path)
-    if users is None:
-        return
+    if users is not None:
+        for user in users:
+            register_user(User(user["username"],
+                               user["display_name"],
+                               user["password_hash"],
+                               permissions_dict=user["permissions"],
+                               uuid_str=user["uuid"],
+                               last_activity=user.get("last_activity", None)))
+    config.user_activity_dirty = False
 
-    for user in users:
-        config.user_list.append(User(user["username"],
-                                     user["display_name"],
-                                     user["password_hash"],
-                                     permissions_dict=user["permissions"],
-                                     uuid_str=user["uuid"])
-                                )
+    if config.user_activity_timer is None:
+        config.user_activity_timer = c_tools.timer_queue.call_later(config.user_activity_flush_interval,
+                                                                    _flush_user_activity_timer)
 
 
-def save_users():
-    """Write users.json to file."""
+def register_user(user: User):
+    """Add the user to the list and the uuid/username index."""
+
+    config.user_list.append(user)
+    config.userIndex["uuid"][user.uuid] = user
+    config.userIndex["username"][user.username.lower()] = user
+
 
-    dict_list = []
-    for user in config.user_list:
-        dict_list.append(user.get_dict(omit_password=False))
+def get_users_data() -> list[dict]:
+    """Return the contents of users.json."""
 
+    return [user.get_dict(omit_password=False) for user in list(config.user_list)]
+
+
+def save_users():
+    """Write users.json to file shortly, coalescing with any other pending changes."""
+
+    config.user_activity_dirty = False
     path = c_tools.get_path(["configuration", "users.json"], user_file=True)
-    c_tools.write_json(dict_list, path)
+    c_tools.write_behind_queue.schedule(path, get_users_data)
+
+
+def flush_user_activity():
+    """Save users.json if any last_activity time has changed."""
+
+    if config.user_activity_dirty:
+        save_users()
+
+
+def _flush_user_activity_timer():
+    """Flush the activity times, then wait for the next flush.
+
+    Runs on the timer queue.
+    """
+
+    flush_user_activity()
+    config.user_activity_timer = c_tools.timer_queue.call_later(config.user_activity_flush_interval,
+                                                                _flush_user_activity_timer)
 
 
 def get_user(username: str = '', uuid_str: str = '') -> User | None:
@@ -263,38 +391,38 @@ def get_user(username: str = '', uuid_str: str = '') -> User | None:
     if username != '' and uuid_str != '':
         raise ValueError("Must supply only one of 'username' or 'uuid_str'")
 
-    username = username.lower()
+    username = username.lower()  # Usernames are case-insensitive
 
     if username == 'admin' or uuid_str == 'admin':
-        filtered = [get_admin()]
-    elif username != '':
-        filtered = [x for x in config.user_list if x.username == username]
-    else:
-        filtered = [x for x in config.user_list if x.uuid == uuid_str]
-
-    if len(filtered) > 0:
-        return filtered[0]
-    return None
+        return get_admin()
+    if username != '':
+        return config.userIndex["username"].get(username, None)
+    return config.userIndex["uuid"].get(uuid_str, None)
 
 
 def create_user(username: str,
                 display_name: str,
                 password: str,
-                permissions: dict[str, Any] | None = None) -> tuple[bool, dict]:
-    """Create a new user."""
+                permissions: dict[str, Any] | None = None,
+                password_hash: str | None = None) -> tuple[bool, dict]:
+    """Create a new user.
+
+    Pass password_hash to use a password that has already been hashed, e.g., with async_hash_password().
+    """
 
     if check_username_available(username) is False:
         if config.debug:
             print(f"create_user: error: username {username} exists")
         return False, {}
 
-    password_hash = hash_password(password)
+    if password_hash is None:
+        password_hash = hash_password(password)
 
     new_user = User(username,
                     display_name,
                     password_hash,
                     permissions_dict=permissions)
-    config.user_list.append(new_user)
+    register_user(new_user)
     save_users()
     return True, new_user.get_dict()
 
@@ -306,11 +434,7 @@ def check_username_available(username: str) -> bool:
 
     if username == 'admin':
         return False
-
-    filtered = [x for x in config.user_list if x.username.lower() == username]
-    if len(filtered) > 0:
-        return False
-    return True
+    return username not in config.userIndex["username"]
 
 
 def authenticate_user(token: str = "", credentials: tuple[str, str] = ("", "")) -> tuple[bool, str]:
@@ -327,13 +451,19 @@ def authenticate_user(token: str = "", credentials: tuple[str, str] = ("", ""))
         return False, ""
 
     if token != "":
+        get_fernet()  # Clears the cache if the key has changed
+        user_uuid = get_cached_token(token)
+        cached = user_uuid is not None
         try:
-            user_uuid = decrypt_token(token)
+            if not cached:
+                user_uuid = decrypt_token(token)
             user = get_user(uuid_str=user_uuid)
         except InvalidToken:
             user = None
         if user is None:
             return False, ""
+        if not cached:
+            cache_token(token, user_uuid)
         user.update_last_activity()
         return True, user_uuid
 
@@ -348,6 +478,27 @@ def authenticate_user(token: str = "", credentials: tuple[str, str] = ("", ""))
     return False, ""
 
 
+async def async_authenticate_user(token: str = "",
+                                  credentials: tuple[str, str] = ("", "")) -> tuple[bool, str]:
+    """Authenticate the user like authenticate_user(), but verify any password without blocking."""
+
+    if token != "" and credentials != ("", ""):
+        # Prefer credentials
+        token = ""
+
+    if credentials == ("", ""):
+        return authenticate_user(token=token)
+
+    username, password = credentials
+    user = get_user(username=username)
+
+    if user is None:
+        return False, ""
+    if await user.async_authenticate(password):
+        return True, user.uuid
+    return False, ""
+
+
 def check_user_permission(action: str,
                           needed_level: str,
                           groups: list[str] | None = None,
@@ -369,30 +520,142 @@ def check_user_permission(action: str,
 
 
 def get_admin():
-    """Return a dummy user account containing the admin details"""
+    """Return a dummy user account containing the admin details.
+
+    The account is kept in memory and only rebuilt when root_admin.txt changes.
+    """
 
     path = c_tools.get_path(["configuration", "root_admin.txt"], user_file=True)
+    mtime = os.stat(path).st_mtime_ns
+    if config.admin_user is not None and config.admin_file_mtime == mtime:
+        return config.admin_user
+
     with config.galleryConfigurationLock:
         with open(path, 'r', encoding='UTF-8') as f:
             admin_pass = f.read()
 
-    return User("admin", "Admin", admin_pass, {
-        "analytics": "edit",
-        "components": {
-            "edit": ["__all"],
-            "edit_content": [],
-            "view": []
-        },
-        "exhibits": "edit",
-        "maintenance": "edit",
-        "schedule": "edit",
-        "settings": "edit",
-        "users": "edit"
-    }, uuid_str='admin')
+    if config.admin_user is not None:
+        # Keep the existing object so that its last activity is preserved
+        config.admin_user.password_hash = admin_pass
+    else:
+        config.admin_user = User("admin", "Admin", admin_pass, {
+            "analytics": "edit",
+            "components": {
+                "edit": ["__all"],
+                "edit_content": [],
+                "view": []
+            },
+            "exhibits": "edit",
+            "maintenance": "edit",
+            "schedule": "edit",
+            "settings": "edit",
+            "users": "edit"
+        }, uuid_str='admin')
+    config.admin_file_mtime = mtime
+    return config.admin_user
 
 
 def hash_password(password: str) -> str:
-    """Return the argon2 hash of the given password"""
+    """Return the argon2 hash of the given password, with a random salt.
+
+    The work is done in the password pool; this blocks until it finishes.
+    """
+
+    return submit_password_task(hash_password_in_worker, password, config.argon2_time_cost,
+                                config.argon2_memory_cost, config.argon2_parallelism).result()
 
-    return password_hasher.hash(bytes(password, 'UTF-8'),
-                                salt=bytes("Constellation", "UTF-8"))
+
+async def async_hash_password(password: str) -> str:
+    """Return the argon2 hash of the given password without blocking the event loop."""
+
+    return await asyncio.wrap_future(submit_password_task(hash_password_in_worker, password,
+                                                          config.argon2_time_cost, config.argon2_memory_cost,
+                                                          config.argon2_parallelism))
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """Return whether the password matches the hash. This blocks until the password pool finishes."""
+
+    return submit_password_task(verify_password_in_worker, password_hash, password).result()
+
+
+async def async_verify_password(password_hash: str, password: str) -> bool:
+    """Return whether the password matches the hash without blocking the event loop."""
+
+    return await asyncio.wrap_future(submit_password_task(verify_password_in_worker, password_hash, password))
+
+
+def get_password_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the thread pool used for Argon2 work, creating it if necessary.
+
+    Argon2 releases the GIL while hashing, so threads run in parallel. Keeping them in their own pool bounds
+    the work and leaves the threads that serve other requests free.
+    """
+
+    with config.passwordPoolLock:
+        if config.password_pool is None:
+            config.password_pool = concurrent.futures.ThreadPoolExecutor(max_workers=config.argon2_workers,
+                                                                         thread_name_prefix="Argon2")
+        return config.password_pool
+
+
+def submit_password_task(func: Callable, *args) -> concurrent.futures.Future:
+    """Run func(*args) in the password pool, keeping track of the queue depth and timing."""
+
+    start = time.monotonic()
+
+    def finished(_):
+        with config.passwordPoolLock:
+            config.password_pool_pending -= 1
+            config.password_pool_completed += 1
+            config.password_pool_total_time += time.monotonic() - start
+
+    pool = get_password_pool()
+    with config.passwordPoolLock:
+        config.password_pool_pending += 1
+    future = pool.submit(func, *args)
+    future.add_done_callback(finished)
+    return future
+
+
+def get_password_pool_metrics() -> dict[str, Any]:
+    """Return the queue depth of the password pool and the mean time to hash or verify, in seconds."""
+
+    with config.passwordPoolLock:
+        completed = config.password_pool_completed
+        return {
+            "workers": config.argon2_workers,
+            "queue_depth": config.password_pool_pending,
+            "completed": completed,
+            "mean_time": config.password_pool_total_time / completed if completed > 0 else None
+        }
+
+
+def shutdown_password_pool():
+    """Stop the password pool's threads."""
+
+    with config.passwordPoolLock:
+        pool = config.password_pool
+        config.password_pool = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_password_in_worker(password: str, time_cost: int, memory_cost: int, parallelism: int) -> str:
+    """Hash the password. This runs in the password pool."""
+
+    hasher = argon2.PasswordHasher(time_cost=time_cost,
+                                   memory_cost=memory_cost,
+                                   parallelism=parallelism,
+                                   hash_len=24,
+                                   type=argon2.Type.ID)
+    return hasher.hash(password)
+
+
+def verify_password_in_worker(password_hash: str, password: str) -> bool:
+    """Check the password against the hash, whose parameters are encoded in it. This runs in the password pool."""
+
+    try:
+        return argon2.PasswordHasher().verify(password_hash, password)
+    except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+        return False
@@ -28,6 +28,7 @@ import aiofiles
 import dateutil.parser
 from fastapi import Body, FastAPI, File, Response, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
@@ -77,95 +78,204 @@ def constellation_schema():
     return app.openapi_schema
 
 
-def send_webpage_update():
-    """Collect the current exhibit status, format it, and send it back to the web client to update the page."""
+def send_webpage_update(sections: Union[list[str], None] = None):
+    """Collect the current exhibit status, format it, and send it back to the web client to update the page.
 
-    update_dict = {}
+    Set sections to build only some of the sections in c_config.update_sections.
+    """
 
-    component_dict_list = []
-    for item in c_config.componentList:
-        temp = {"class": "exhibitComponent",
-                "constellation_app_id": item.config["app_name"],
-                "helperAddress": item.helperAddress,
-                "id": item.id,
-                "ip_address": item.ip_address,
-                "groups": item.groups,
-                "lastContactDateTime": item.last_contact_datetime,
-                "latency": item.latency,
-                "platform_details": item.platform_details,
-                "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
-                "status": item.current_status(),
-                "uuid": item.uuid}
-        if "content" in item.config:
-            temp["content"] = item.config["content"]
-        if "definition" in item.config:
-            temp["definition"] = item.config["definition"]
-        if "error" in item.config:
-            temp["error"] = item.config["error"]
-        if "permissions" in item.config:
-            temp["permissions"] = item.config["permissions"]
-        if "description" in item.config:
-            temp["description"] = item.config["description"]
-        if "autoplay_audio" in item.config:
-            temp["autoplay_audio"] = item.config["autoplay_audio"]
-        component_dict_list.append(temp)
-
-    for item in c_config.projectorList:
-        temp = {"class": "projector",
-                "groups": item.groups,
-                "id": item.id,
-                "ip_address": item.ip_address,
-                "latency": item.latency,
-                "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
-                "password": item.password,
-                "protocol": item.connection_type,
-                "state": item.state,
-                "status": item.state["status"],
-                "uuid": item.uuid}
-        if "permissions" in item.config:
-            temp["permissions"] = item.config["permissions"]
-        if "description" in item.config:
-            temp["description"] = item.config["description"]
-        component_dict_list.append(temp)
-
-    for item in c_config.wakeOnLANList:
-        temp = {"class": "wolComponent",
-                "id": item.id,
-                "groups": item.groups,
-                "ip_address": item.ip_address,
-                "latency": item.latency,
-                "mac_address": item.mac_address,
-                "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
-                "status": item.state["status"],
-                "uuid": item.uuid}
-        if "permissions" in item.config:
-            temp["permissions"] = item.config["permissions"]
-        if "description" in item.config:
-            temp["description"] = item.config["description"]
-        component_dict_list.append(temp)
-
-    update_dict["components"] = component_dict_list
-    update_dict["gallery"] = {"current_exhibit": c_config.current_exhibit,
-                              "availableExhibits": c_config.exhibit_list,
-                              "galleryName": c_config.gallery_name,
-                              "softwareVersion": str(c_config.software_version),
-                              "softwareVersionAvailable": c_config.software_update_available_version,
-                              "updateAvailable": str(c_config.software_update_available).lower()}
-
-    update_dict["issues"] = {"issueList": [x.details for x in c_config.issueList],
-                             "lastUpdateDate": c_config.issueList_last_update_date}
-
-    update_dict["groups"] = {"group_list": c_config.group_list,
-                             "last_update_date": c_config.group_list_last_update_date}
+    if sections is None:
+        sections = c_config.update_sections
 
-    with c_config.scheduleLock:
-        update_dict["schedule"] = {"updateTime": c_config.scheduleUpdateTime,
-                                   "schedule": c_config.json_schedule_list,
-                                   "nextEvent": c_config.json_next_event}
+    update_dict = {}
+
+    if "components" in sections:
+        component_dict_list = []
+        for item in c_config.componentList:
+            temp = {"class": "exhibitComponent",
+                    "constellation_app_id": item.config["app_name"],
+                    "helperAddress": item.helperAddress,
+                    "id": item.id,
+                    "ip_address": item.ip_address,
+                    "groups": item.groups,
+                    "lastContactDateTime": item.last_contact_datetime,
+                    "latency": item.latency,
+                    "platform_details": item.platform_details,
+                    "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
+                    "status": item.current_status(),
+                    "uuid": item.uuid}
+            if "content" in item.config:
+                temp["content"] = item.config["content"]
+            if "definition" in item.config:
+                temp["definition"] = item.config["definition"]
+            if "error" in item.config:
+                temp["error"] = item.config["error"]
+            if "permissions" in item.config:
+                temp["permissions"] = item.config["permissions"]
+            if "description" in item.config:
+                temp["description"] = item.config["description"]
+            if "autoplay_audio" in item.config:
+                temp["autoplay_audio"] = item.config["autoplay_audio"]
+            component_dict_list.append(temp)
+
+        for item in c_config.projectorList:
+            temp = {"class": "projector",
+                    "groups": item.groups,
+                    "id": item.id,
+                    "ip_address": item.ip_address,
+                    "latency": item.latency,
+                    "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
+                    "password": item.password,
+                    "protocol": item.connection_type,
+                    "state": item.state,
+                    "status": item.state["status"],
+                    "uuid": item.uuid}
+            if "permissions" in item.config:
+                temp["permissions"] = item.config["permissions"]
+            if "description" in item.config:
+                temp["description"] = item.config["description"]
+            component_dict_list.append(temp)
+
+        for item in c_config.wakeOnLANList:
+            temp = {"class": "wolComponent",
+                    "id": item.id,
+                    "groups": item.groups,
+                    "ip_address": item.ip_address,
+                    "latency": item.latency,
+                    "mac_address": item.mac_address,
+                    "maintenance_status": item.config.get("maintenance_status", "Off floor, not working"),
+                    "status": item.state["status"],
+                    "uuid": item.uuid}
+            if "permissions" in item.config:
+                temp["permissions"] = item.config["permissions"]
+            if "description" in item.config:
+                temp["description"] = item.config["description"]
+            component_dict_list.append(temp)
+
+        update_dict["components"] = component_dict_list
+
+    if "gallery" in sections:
+        update_dict["gallery"] = {"current_exhibit": c_config.current_exhibit,
+                                  "availableExhibits": c_config.exhibit_list,
+                                  "galleryName": c_config.gallery_name,
+                                  "softwareVersion": str(c_config.software_version),
+                                  "softwareVersionAvailable": c_config.software_update_available_version,
+                                  "updateAvailable": str(c_config.software_update_available).lower()}
+
+    if "issues" in sections:
+        update_dict["issues"] = {"issueList": [x.details for x in c_config.issueList],
+                                 "lastUpdateDate": c_config.issueList_last_update_date}
+
+    if "groups" in sections:
+        update_dict["groups"] = {"group_list": c_config.group_list,
+                                 "last_update_date": c_config.group_list_last_update_date}
+
+    if "schedule" in sections:
+        with c_config.scheduleLock:
+            update_dict["schedule"] = {"updateTime": c_config.scheduleUpdateTime,
+                                       "schedule": c_config.json_schedule_list,
+                                       "nextEvent": c_config.json_next_event}
 
     return update_dict
 
 
+def diff_component_dicts(old: dict[str, dict[str, Any]], new: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """Return the JSON Patch operations that turn one set of component dicts, keyed by uuid, into another.
+
+    Paths have the form /<uuid> for whole components and /<uuid>/<field> for individual fields.
+    """
+
+    patch = []
+    for uuid_str in old:
+        if uuid_str not in new:
+            patch.append({"op": "remove", "path": f"/{uuid_str}"})
+
+    for uuid_str, component in new.items():
+        previous = old.get(uuid_str, None)
+        if previous is None:
+            patch.append({"op": "add", "path": f"/{uuid_str}", "value": component})
+            continue
+        for key, value in component.items():
+            if key not in previous:
+                patch.append({"op": "add", "path": f"/{uuid_str}/{key}", "value": value})
+            elif previous[key] != value:
+                patch.append({"op": "replace", "path": f"/{uuid_str}/{key}", "value": value})
+        for key in previous:
+            if key not in component:
+                patch.append({"op": "remove", "path": f"/{uuid_str}/{key}"})
+
+    return patch
+
+
+def join_json_sections(version: int, sections: dict[str, str]) -> str:
+    """Combine already-serialized sections into one JSON object string, along with the version."""
+
+    parts = [f'"version": {version}'] + [f'{json.dumps(name)}: {data}' for name, data in sections.items()]
+    return "{" + ", ".join(parts) + "}"
+
+
+def refresh_webpage_update() -> None:
+    """Publish a new version of the webpage update if any section has changed since the last one.
+
+    Only the changed sections are rebuilt and serialized. Each version stores a full snapshot and a delta
+    from the previous version that contains only the changed sections. Both are shared by every client.
+    """
+
+    with c_config.webpageUpdateLock:
+        with c_config.updateWaitersLock:
+            # Read the versions before building so that a change made mid-build triggers another rebuild
+            sequence = c_config.update_sequence
+            section_versions = dict(c_config.section_versions)
+        if c_config.webpage_update_sequence == sequence:
+            return
+        c_config.webpage_update_sequence = sequence
+
+        changed = [section for section in c_config.update_sections
+                   if section_versions[section] != c_config.webpage_update_section_versions.get(section, None)]
+        c_config.webpage_update_section_versions = section_versions
+        if len(changed) == 0:
+            return
+
+        update = send_webpage_update(changed)
+        delta_sections = {}
+        for section in changed:
+            data = c_tools.json_dumps(update[section])
+            c_config.webpage_update_section_json[section] = data
+            if section == "components":
+                # Parse the serialized list so that we compare plain values, not live component state
+                components = {component["uuid"]: component for component in c_tools.json_loads(data)}
+                patch = diff_component_dicts(c_config.webpage_update_components, components)
+                c_config.webpage_update_components = components
+                delta_sections["components_patch"] = c_tools.json_dumps(patch)
+            else:
+                delta_sections[section] = data
+
+        c_config.webpage_update_version += 1
+        version = c_config.webpage_update_version
+        c_config.webpage_update_snapshot = join_json_sections(version, c_config.webpage_update_section_json)
+        c_config.webpage_update_deltas.append((version, join_json_sections(version, delta_sections)))
+
+
+def get_webpage_update_events(since_version: int) -> tuple[int, list[tuple[str, int, str]]]:
+    """Return the events needed to bring a client at since_version up to date.
+
+    Clients that have no version yet, or have fallen further behind than the stored deltas reach,
+    receive a full snapshot. Also returns the update_sequence the events reflect.
+    """
+
+    refresh_webpage_update()
+    with c_config.webpageUpdateLock:
+        sequence = c_config.webpage_update_sequence
+        version = c_config.webpage_update_version
+        if since_version == version:
+            return sequence, []
+        deltas = c_config.webpage_update_deltas
+        if since_version <= 0 or len(deltas) == 0 or deltas[0][0] > since_version + 1:
+            return sequence, [("update", version, c_config.webpage_update_snapshot)]
+        return sequence, [("delta", delta_version, data) for delta_version, data in deltas
+                          if delta_version > since_version]
+
+
 def command_line_setup_print_gui() -> None:
     """Helper to print the header content for the setup tool"""
 
@@ -280,6 +390,13 @@ def quit_handler(*args) -> None:
     for component in c_config.wakeOnLANList:
         component.clean_up()
         component.save()
+    c_users.flush_user_activity()
+    c_tools.write_behind_queue.flush()
+    try:
+        c_tools.run_coroutine(c_tools.close_http_client()).result(timeout=2)
+    except Exception:
+        pass
+    c_users.shutdown_password_pool()
 
     with c_config.logLock:
         logging.info("Server shutdown")
@@ -302,24 +419,23 @@ def error_handler(*exc_info) -> None:
 def check_for_software_update() -> None:
     """Download the version.txt file from GitHub and check if there is an update"""
 
-    print("Checking for update... ", end="")
     try:
         for line in urllib.request.urlopen(
-                "https://raw.githubusercontent.com/Cosmic-Chatter/Constellation/main/control_server/version.txt"):
+                "https://raw.githubusercontent.com/Cosmic-Chatter/Constellation/main/control_server/version.txt",
+                timeout=10):
             if float(line.decode('utf-8')) > c_config.software_version:
                 c_config.software_update_available = True
                 c_config.software_update_available_version = line.decode('utf-8').strip()
+                c_tools.notify_update("gallery")
                 break
-    except urllib.error.HTTPError:
-        print("cannot connect to update server")
-        return
-    except urllib.error.URLError:
-        print("cannot connect to update server")
+    except (urllib.error.URLError, TimeoutError):
+        # Includes HTTPError
+        print("Checking for update: cannot connect to update server")
         return
     if c_config.software_update_available:
-        print("update available!")
+        print("Checking for update: update available!")
     else:
-        print("the server is up to date.")
+        print("Checking for update: the server is up to date.")
 
 
 # Check whether we have packaged with Pyinstaller and set the appropriate root path.
@@ -354,7 +470,11 @@ async def lifespan(app: FastAPI):
     quit_handler()
 
 
-app = FastAPI(lifespan=lifespan)
+if c_tools.orjson is not None:
+    default_response_class = ORJSONResponse
+else:
+    default_response_class = JSONResponse
+app = FastAPI(lifespan=lifespan, default_response_class=default_response_class)
 
 app.add_middleware(
     CORSMiddleware,
@@ -374,16 +494,16 @@ def get_config():
 # User account actions
 
 @app.post("/user/login")
-def log_in(response: Response,
-           request: Request,
-           credentials: tuple[str, str] = Body(description="A tuple containing the username and password.",
-                                               default=("", ""), embed=True)
-           ):
+async def log_in(response: Response,
+                 request: Request,
+                 credentials: tuple[str, str] = Body(description="A tuple containing the username and password.",
+                                                     default=("", ""), embed=True)
+                 ):
     """Authenticate the user and return the permissions and an authentication token."""
 
     token = request.cookies.get("authToken", "")
 
-    success, user_uuid = c_users.authenticate_user(token=token, credentials=credentials)
+    success, user_uuid = await c_users.async_authenticate_user(token=token, credentials=credentials)
     if success is False:
         return {"success": False, "reason": "authentication_failed"}
 
@@ -399,12 +519,12 @@ def log_in(response: Response,
 
 
 @app.post("/user/create")
-def create_user(request: Request,
-                username: str = Body(description="The username"),
-                password: str = Body(description="The password for the account to create."),
-                display_name: str = Body(description="The name of the account holder."),
-                permissions: dict | None = Body(description="A dictionary of permissions for the new account.",
-                                                default=None)):
+async def create_user(request: Request,
+                      username: str = Body(description="The username"),
+                      password: str = Body(description="The password for the account to create."),
+                      display_name: str = Body(description="The name of the account holder."),
+                      permissions: dict | None = Body(description="A dictionary of permissions for the new account.",
+                                                      default=None)):
     """Create a new user account."""
 
     token = request.cookies.get("authToken", "")
@@ -412,7 +532,11 @@ def create_user(request: Request,
     if success is False:
         return {"success": False, "reason": reason}
 
-    success, user_dict = c_users.create_user(username, display_name, password, permissions=permissions)
+    if c_users.check_username_available(username) is False:
+        return {"success": False, "user": {}, "reason": "username_taken"}
+    password_hash = await c_users.async_hash_password(password)
+    success, user_dict = c_users.create_user(username, display_name, password,
+                                             permissions=permissions, password_hash=password_hash)
 
     response = {"success": success, "user": user_dict}
     if success is False:
@@ -421,13 +545,13 @@ def create_user(request: Request,
 
 
 @app.post("/user/{uuid_str}/edit")
-def edit_user(request: Request,
-              uuid_str: str,
-              username: str | None = Body(description="The username", default=None),
-              password: str | None = Body(description="The password for the account to create.", default=None),
-              display_name: str | None = Body(description="The name of the account holder.", default=None),
-              permissions: dict | None = Body(description="A dictionary of permissions for the new account.",
-                                              default=None)):
+async def edit_user(request: Request,
+                    uuid_str: str,
+                    username: str | None = Body(description="The username", default=None),
+                    password: str | None = Body(description="The password for the account to create.", default=None),
+                    display_name: str | None = Body(description="The name of the account holder.", default=None),
+                    permissions: dict | None = Body(description="A dictionary of permissions for the new account.",
+                                                    default=None)):
     """Edit the given user."""
 
     token = request.cookies.get("authToken", "")
@@ -440,7 +564,8 @@ def edit_user(request: Request,
         return {"success": False, "reason": "user_does_not_exist"}
 
     if username is not None and username != user.username:
-        if c_users.check_username_available(username) is True:
+        # Allow changing only the case of the user's own name
+        if username.lower() == user.username.lower() or c_users.check_username_available(username) is True:
             user.username = username
         else:
             return {"success": False, "reason": "username_taken"}
@@ -448,10 +573,11 @@ def edit_user(request: Request,
     if display_name is not None:
         user.display_name = display_name
     if password is not None:
-        user.password_hash = c_users.hash_password(password)
+        user.password_hash = await c_users.async_hash_password(password)
     if permissions is not None:
         user.permissions = permissions
     c_users.save_users()
+    c_users.invalidate_user_tokens(user.uuid)
 
     return {"success": success, "user": user.get_dict()}
 
@@ -468,7 +594,7 @@ def list_users(permissions: dict[str, str] = Body(description="A dictionary of p
         error = False
         for key in permissions:
 
-            if user.check_permission(key, permissions[key]) is False:
+            if user.has_permission(key, permissions[key]) is False:
                 error = True
         if not error:
             matched_users.append(user.get_dict())
@@ -476,6 +602,34 @@ def list_users(permissions: dict[str, str] = Body(description="A dictionary of p
     return {"success": True, "users": matched_users}
 
 
+@app.post("/user/filterComponents")
+def filter_components_for_user(request: Request,
+                               components: list[str] | None = Body(
+                                   description="The uuids of the components to check. Omit to check every component.",
+                                   default=None),
+                               groups: list[str] | None = Body(description="The uuids of the groups to check.",
+                                                               default=None),
+                               needed_level: str = Body(description="The permission level needed.",
+                                                        default="view")):
+    """Return the components and groups for which the current user has the needed permission."""
+
+    token = request.cookies.get("authToken", "")
+    success, user_uuid = c_users.authenticate_user(token=token)
+    if success is False:
+        return {"success": False, "reason": "authentication_failed"}
+    user = c_users.get_user(uuid_str=user_uuid)
+
+    if components is None:
+        component_list = c_config.componentList + c_config.projectorList + c_config.wakeOnLANList
+    else:
+        component_list = [c_exhibit.get_exhibit_component(component_uuid=x) for x in components]
+        component_list = [x for x in component_list if x is not None]
+
+    return {"success": True,
+            "components": [x.uuid for x in user.filter_components(component_list, needed_level)],
+            "groups": user.filter_groups(groups if groups is not None else [], needed_level)}
+
+
 @app.get("/user/{user_uuid}/getDisplayName")
 def get_user_display_name(user_uuid: str):
     """Get the display name for a user account."""
@@ -487,23 +641,27 @@ def get_user_display_name(user_uuid: str):
 
 
 @app.post('/user/{user_uuid}/changePassword')
-def change_user_password(user_uuid: str,
-                         current_password: str = Body(description="The plaintext of the current password."),
-                         new_password: str = Body(description="The plaintext of the password to set.")):
+async def change_user_password(user_uuid: str,
+                               current_password: str = Body(description="The plaintext of the current password."),
+                               new_password: str = Body(description="The plaintext of the password to set.")):
     """Change the password for the given user"""
 
     user = c_users.get_user(uuid_str=user_uuid)
+    if user is None:
+        return {"success": False, "reason": "user_does_not_exist"}
 
     # First, check that the current password is correct
-    if c_users.hash_password(current_password) != user.password_hash:
+    if await c_users.async_verify_password(user.password_hash, current_password) is False:
         return {"success": False, "reason": "authentication_failed"}
 
     # Then, update the password
+    password_hash = await c_users.async_hash_password(new_password)
     if user.uuid != "admin":
-        user.password_hash = c_users.hash_password(new_password)
+        user.password_hash = password_hash
         c_users.save_users()
+        c_users.invalidate_user_tokens(user.uuid)
     else:
-        c_users.create_root_admin(new_password)
+        c_users.save_root_admin(password_hash)
 
     return {"success": True}
 
@@ -563,7 +721,7 @@ async def edit_component(request: Request,
     if description is not None:
         component.config["description"] = description
     component.save()
-    c_config.last_update_time = time.time()
+    c_tools.notify_update("components")
     return {"success": True}
 
 
@@ -601,7 +759,8 @@ async def get_group_details(request: Request, uuid_str: str):
 
     if group is None:
         return {"success": False, "reason": "Group does not exist."}
-    return {"success": True, "details": group}
+    components = [component.uuid for component in c_exhibit.get_group_components(uuid_str)]
+    return {"success": True, "details": group, "components": components}
 
 
 @app.post("/group/create")
@@ -1175,7 +1334,7 @@ async def delete_maintenance_record(request: Request, data: dict[str, Any]):
     file_path = c_tools.get_path(["maintenance-logs", data["id"] + ".txt"], user_file=True)
     with c_config.maintenanceLock:
         response = c_tools.delete_file(file_path)
-    c_config.last_update_time = time.time()
+    c_tools.notify_update("components")
     return response
 
 
@@ -1245,7 +1404,7 @@ async def update_maintenance_status(request: Request,
                 f.write(json.dumps(record) + "\n")
             success = True
             reason = ""
-            c_config.last_update_time = time.time()
+            c_tools.notify_update("components")
         except FileNotFoundError:
             success = False
             reason = f"File path {file_path} does not exist"
@@ -1313,7 +1472,7 @@ async def edit_projector(request: Request,
     if description is not None:
         proj.config["description"] = description
     proj.save()
-    c_config.last_update_time = time.time()
+    c_tools.notify_update("components")
     return {"success": True}
 
 
@@ -1373,7 +1532,7 @@ async def edit_static_component(request: Request,
     if description is not None:
         component.config["description"] = description
     component.save()
-    c_config.last_update_time = time.time()
+    c_tools.notify_update("components")
     return {"success": True}
 
 
@@ -1433,7 +1592,7 @@ async def edit_wake_on_LAN_component(request: Request,
     if description is not None:
         component.config["description"] = description
     component.save()
-    c_config.last_update_time = time.time()
+    c_tools.notify_update("components")
 
     return {"success": True}
 
@@ -1456,8 +1615,7 @@ async def convert_schedule(
         shutil.copy(c_tools.get_path(["schedules", convert_from.lower() + ".json"], user_file=True),
                     c_tools.get_path(["schedules", date + ".json"], user_file=True))
 
-    c_config.last_update_time = time.time()
-    # Reload the schedule from disk
+    # Reload the schedule from disk, which notifies clients of the change
     c_sched.retrieve_json_schedule()
 
     # Send the updated schedule back
@@ -1482,7 +1640,6 @@ async def create_schedule(request: Request,
         return {"success": False, "reason": reason}
 
     success, schedule = c_sched.create_schedule(c_tools.with_extension(name, 'json'), entries)
-    c_sched.retrieve_json_schedule()
     return {"success": success, "schedule": schedule}
 
 
@@ -1549,7 +1706,6 @@ async def delete_schedule_action(request: Request,
         return {"success": False, "reason": reason}
 
     c_sched.delete_json_schedule_event(schedule_name + ".json", schedule_id)
-    c_sched.retrieve_json_schedule()
 
     # Send the updated schedule back
     with c_config.scheduleLock:
@@ -1574,9 +1730,8 @@ async def delete_schedule(request: Request,
     with c_config.scheduleLock:
         json_schedule_path = c_tools.get_path(["schedules", name + ".json"], user_file=True)
         os.remove(json_schedule_path)
-    c_config.last_update_time = time.time()
 
-    # Reload the schedule from disk
+    # Reload the schedule from disk, which notifies clients of the change
     c_sched.retrieve_json_schedule()
 
     # Send the updated schedule back
@@ -1677,9 +1832,6 @@ async def update_schedule(
 
     response_dict = {}
     if not error:
-        # Reload the schedule from disk
-        c_sched.retrieve_json_schedule()
-
         # Send the updated schedule back
         with c_config.scheduleLock:
             response_dict["updateTime"] = c_config.scheduleUpdateTime
@@ -1757,6 +1909,22 @@ async def get_version():
     return response
 
 
+@app.get("/system/getMetrics")
+async def get_metrics():
+    """Return performance details for monitoring the server."""
+
+    metrics = {
+        "latency_sweep": {
+            "duration": c_config.latency_sweep_duration,
+            "host_count": c_config.latency_sweep_host_count,
+            "interval": c_config.latency_poll_interval
+        },
+        "projector_commands": c_tools.command_executor.get_metrics(),
+        "password_hashing": c_users.get_password_pool_metrics()
+    }
+    return {"success": True, "metrics": metrics}
+
+
 @app.post("/system/ping")
 async def handle_ping(data: dict[str, Any], request: Request):
     """Respond to an incoming heartbeat signal with ahy updates."""
@@ -1796,7 +1964,7 @@ async def update_configuration(target: str,
 
         if target == "descriptions":
             c_exhibit.read_descriptions_configuration()
-            c_config.last_update_time = time.time()
+            c_tools.notify_update("components")
 
     return {"success": True}
 
@@ -1805,24 +1973,29 @@ async def update_configuration(target: str,
 async def send_update_stream(request: Request):
     """Create a server-side event stream to send updates to the client."""
 
+    # EventSourceResponse cancels the generator when the client disconnects, so we only
+    # need to wake up when something has changed.
     async def event_generator():
-        last_update_time = None
+        last_sequence = None
+        last_send_time = 0
+        version = 0  # Forces a full snapshot on connect
         while True:
-            # If client closes connection, stop sending events
-            if await request.is_disconnected():
-                break
-
-            # Checks for new updates and return them to client
-            if c_config.last_update_time != last_update_time:
-                last_update_time = c_config.last_update_time
-
-                yield {
-                    "event": "update",
-                    "id": str(last_update_time),
-                    "retry": 5000,  # milliseconds
-                    "data": json.dumps(send_webpage_update(), default=str)
-                }
-            await asyncio.sleep(0.5)  # seconds
+            if c_config.update_sequence != last_sequence:
+                # Coalesce bursts of changes (e.g., many pings) into a single event
+                wait_time = last_send_time + c_config.update_stream_min_interval - time.monotonic()
+                if wait_time > 0:
+                    await asyncio.sleep(wait_time)
+
+                last_sequence, events = get_webpage_update_events(version)
+                last_send_time = time.monotonic()
+                for event, version, data in events:
+                    yield {
+                        "event": event,
+                        "id": str(version),
+                        "retry": 5000,  # milliseconds
+                        "data": data
+                    }
+            await c_tools.wait_for_update(last_sequence)
 
     return EventSourceResponse(event_generator())
 
@@ -1874,7 +2047,9 @@ if __name__ == "__main__":
     c_exhibit.load_components()
     c_proj.poll_projectors()
     c_exhibit.poll_wake_on_LAN_devices()
-    check_for_software_update()
+    c_exhibit.poll_latency()
+    # Don't hold up startup waiting for GitHub
+    threading.Thread(target=check_for_software_update, name="Check for update", daemon=True).start()
 
     log_level = "warning"
     if c_config.debug:
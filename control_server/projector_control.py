@@ -1,48 +1,234 @@
 """Communicate with projectors using PJLink commands"""
 
 # Standard imports
-from typing import Union
+import asyncio
+import hashlib
+from typing import Any, Union
 
 # Non-standard imports
-import pypjlink
+from pypjlink.projector import ERROR_STATES_REV, POWER_STATES, POWER_STATES_REV, SOURCE_TYPES_REV
 
+PJLINK_PORT = 4352
+PJLINK_ERRORS = {
+    "ERR1": "undefined command",
+    "ERR2": "out of parameter",
+    "ERR3": "unavailable time",
+    "ERR4": "projector failure"
+}
 
-def pjlink_connect(ip: str, password: str = None, timeout: float = 2) -> pypjlink.projector.Projector:
-    """Connect to a PJLink projector using pypjlink"""
 
-    projector = pypjlink.Projector.from_address(ip, timeout=timeout)
-    projector.authenticate(password=password)
+class PJLinkError(Exception):
+    """The projector could not be reached or refused a command."""
 
-    return projector
 
+class PJLinkClient:
+    """An asyncio PJLink connection to a single projector.
 
-def pjlink_send_command(connection: pypjlink.projector.Projector, command: str) -> Union[str, None]:
-    """Send a command using the PJLink protocol"""
+    The authenticated connection is kept open between calls and reopened when the projector closes it
+    (PJLink projectors drop idle connections after about 30 seconds). Calls are serialized, so one client
+    can be shared by polling and commands. Must only be used from one event loop.
+    """
 
-    result = None
-    try:
-        if command == "error_status":
-            result = connection.get_errors()
-        elif command == "get_model":
-            result = connection.get_manufacturer() + " " + connection.get_product_name()
-        elif command == "lamp_status":
-            result = connection.get_lamps()
-        elif command == "power_off":
-            connection.set_power("off")
-            result = "off"
-        elif command == "power_on":
-            connection.set_power("on")
-            result = "on"
-        elif command == "power_state":
-            result = connection.get_power()
-        elif command == "get_input":
-            result = connection.get_input()
-        elif command == "get_inputs":
-            result = connection.get_inputs()
-        else:
+    def __init__(self, ip_address: str, password: Union[str, None] = None, port: int = PJLINK_PORT,
+                 timeout: float = 2):
+        self.ip_address = ip_address
+        self.password = password
+        self.port = port
+        self.timeout = timeout  # Seconds to wait for the connection and for each response
+
+        self.reader: Union[asyncio.StreamReader, None] = None
+        self.writer: Union[asyncio.StreamWriter, None] = None
+        self.auth_digest: str = ""  # Must prefix the first command sent after connecting
+        self.pipeline: bool = True  # Cleared if the projector can't handle several queries at once
+        self.lock = asyncio.Lock()
+
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    def close(self):
+        """Close the connection, if it is open."""
+
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+        self.auth_digest = ""
+
+    async def connect(self):
+        """Open a new connection and prepare the authentication response, if one is needed."""
+
+        self.close()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.ip_address, self.port),
+                                                              self.timeout)
+            greeting = await self.read_line()
+        except (OSError, EOFError, asyncio.TimeoutError) as e:
+            self.close()
+            raise PJLinkError(f"cannot connect to {self.ip_address}: {e!r}") from e
+
+        # The greeting is "PJLINK 0" without authentication or "PJLINK 1 <salt>" with it
+        if not greeting.upper().startswith("PJLINK ") or len(greeting) < 8:
+            self.close()
+            raise PJLinkError(f"unexpected greeting from {self.ip_address}: {greeting!r}")
+        if greeting[7] == "1":
+            if self.password is None:
+                self.close()
+                raise PJLinkError(f"{self.ip_address} requires a password")
+            salt = greeting[9:17]
+            self.auth_digest = hashlib.md5((salt + self.password).encode("UTF-8")).hexdigest()
+
+    async def read_line(self) -> str:
+        data = await asyncio.wait_for(self.reader.readuntil(b"\r"), self.timeout)
+        return data[:-1].decode("UTF-8", errors="replace")
+
+    async def query(self, commands: list[tuple[str, str]]) -> list[Union[str, PJLinkError]]:
+        """Send each (body, parameter) command and return the responses in order.
+
+        When the projector allows it, the commands are written together and the responses read back
+        in one round trip. An error reported for an individual command is returned in its place;
+        failing to talk to the projector at all raises PJLinkError.
+        """
+
+        async with self.lock:
+            retried = False
+            while True:
+                reused = self.is_connected()
+                pipelined = self.pipeline and len(commands) > 1
+                try:
+                    if not reused:
+                        await self.connect()
+                    return await self.exchange(commands, pipelined)
+                except (OSError, EOFError, ValueError, asyncio.TimeoutError) as e:
+                    self.close()
+                    if not retried and (reused or pipelined):
+                        # A reused connection may have been dropped while idle. A fresh one that fails
+                        # mid-pipeline suggests a projector that needs one command at a time.
+                        if not reused:
+                            self.pipeline = False
+                        retried = True
+                        continue
+                    raise PJLinkError(f"error communicating with {self.ip_address}: {e!r}") from e
+                except BaseException:
+                    # Includes cancellation, which leaves the connection in an unknown state
+                    self.close()
+                    raise
+
+    async def exchange(self, commands: list[tuple[str, str]], pipelined: bool) -> list[Union[str, PJLinkError]]:
+        """Write the commands and read their responses over the open connection."""
+
+        lines = []
+        for body, param in commands:
+            lines.append(self.auth_digest + f"%1{body} {param}\r")
+            self.auth_digest = ""
+
+        if pipelined:
+            self.writer.write("".join(lines).encode("UTF-8"))
+            await self.writer.drain()
+            return [await self.read_response(body) for body, _ in commands]
+
+        responses = []
+        for line, (body, _) in zip(lines, commands):
+            self.writer.write(line.encode("UTF-8"))
+            await self.writer.drain()
+            responses.append(await self.read_response(body))
+        return responses
+
+    async def read_response(self, body: str) -> Union[str, PJLinkError]:
+        """Read the response to the given command, which has the form %1BODY=PARAM."""
+
+        line = await self.read_line()
+        if line.upper().startswith("PJLINK ERRA"):
+            raise PJLinkError(f"authentication failed for {self.ip_address}")
+        if len(line) < 7 or line[0] != "%" or line[2:6].upper() != body or line[6] != "=":
+            raise ValueError(f"unexpected response to {body}: {line!r}")
+
+        param = line[7:]
+        if param in PJLINK_ERRORS:
+            return PJLinkError(PJLINK_ERRORS[param])
+        return param
+
+    async def get_status(self) -> dict[str, Any]:
+        """Return the model, power state, lamp status, and error status in one round trip.
+
+        Values the projector won't report are None.
+        """
+
+        manufacturer, product, power, lamps, errors = await self.query([("INF1", "?"), ("INF2", "?"),
+                                                                        ("POWR", "?"), ("LAMP", "?"),
+                                                                        ("ERST", "?")])
+        model = None
+        if isinstance(manufacturer, str) and isinstance(product, str):
+            model = manufacturer + " " + product
+
+        return {"model": model,
+                "power_state": parse_power(power),
+                "lamp_status": parse_lamps(lamps),
+                "error_status": parse_errors(errors)}
+
+    async def send_command(self, command: str) -> Any:
+        """Send a command by its alias and return the parsed result, or None if the projector refuses it."""
+
+        queries = {
+            "error_status": ("ERST", "?", parse_errors),
+            "get_input": ("INPT", "?", parse_input),
+            "get_inputs": ("INST", "?", parse_inputs),
+            "lamp_status": ("LAMP", "?", parse_lamps),
+            "power_off": ("POWR", POWER_STATES["off"], lambda x: "off"),
+            "power_on": ("POWR", POWER_STATES["on"], lambda x: "on"),
+            "power_state": ("POWR", "?", parse_power)
+        }
+
+        if command == "get_model":
+            status = await self.get_status()
+            return status["model"]
+        if command not in queries:
             print(f"Command alias {command} not found for PJLink")
-    except pypjlink.projector.ProjectorError as e:
-        print("Error:", e.args)
-    except IndexError:
-        print("Error sending request: has the connection expired?")
-    return result
+            return None
+
+        body, param, parse = queries[command]
+        response = (await self.query([(body, param)]))[0]
+        if isinstance(response, PJLinkError):
+            print("Error:", response.args)
+            return None
+        return parse(response)
+
+
+def parse_power(param: Union[str, PJLinkError]) -> Union[str, None]:
+    if isinstance(param, PJLinkError):
+        return None
+    return POWER_STATES_REV.get(param, None)
+
+
+def parse_lamps(param: Union[str, PJLinkError]) -> Union[list[tuple[int, bool]], None]:
+    """Parse pairs of lamp hours and on/off state."""
+
+    if isinstance(param, PJLinkError):
+        return None
+    values = param.split(" ")
+    try:
+        return [(int(hours), bool(int(state))) for hours, state in zip(values[::2], values[1::2])]
+    except ValueError:
+        return None
+
+
+def parse_errors(param: Union[str, PJLinkError]) -> Union[dict[str, str], None]:
+    """Parse the status of the fan, lamp, temperature, cover, filter, and other."""
+
+    if isinstance(param, PJLinkError):
+        return None
+    keys = ["fan", "lamp", "temperature", "cover", "filter", "other"]
+    if len(param) != len(keys):
+        return None
+    return {key: ERROR_STATES_REV.get(value, "error") for key, value in zip(keys, param)}
+
+
+def parse_input(param: Union[str, PJLinkError]) -> Union[tuple[str, int], None]:
+    if isinstance(param, PJLinkError) or len(param) != 2 or not param[1].isdigit():
+        return None
+    return SOURCE_TYPES_REV.get(param[0], param[0]), int(param[1])
+
+
+def parse_inputs(param: Union[str, PJLinkError]) -> Union[list[tuple[str, int]], None]:
+    if isinstance(param, PJLinkError):
+        return None
+    return [x for x in (parse_input(value) for value in param.split(" ")) if x is not None]
@@ -1,7 +1,17 @@
+import asyncio
+import collections
+import contextlib
 import datetime
+import http.server
 import os
+import socket
+import tempfile
+import threading
+import time
 import unittest
+import unittest.mock
 
+import component_helpers
 import config
 import constellation_exhibit as c_exhibit
 import constellation_issues as c_issues
@@ -10,6 +20,24 @@ import constellation_projector as c_proj
 import constellation_schedule as c_sched
 import constellation_tools as c_tools
 import constellation_tracker as c_track
+import constellation_users as c_users
+import control_server
+import projector_control
+from cryptography.fernet import Fernet
+
+
+@contextlib.contextmanager
+def temp_app_path(*directories: str):
+    """Point config.APP_PATH at a temporary directory containing the given subdirectories."""
+
+    app_path = config.APP_PATH
+    try:
+        with tempfile.TemporaryDirectory() as config.APP_PATH:
+            for directory in directories:
+                os.mkdir(os.path.join(config.APP_PATH, directory))
+            yield config.APP_PATH
+    finally:
+        config.APP_PATH = app_path
 
 
 class TestHelperMethods(unittest.TestCase):
@@ -18,6 +46,10 @@ class TestHelperMethods(unittest.TestCase):
         # Runs prior to each test
 
         config.componentList = []
+        config.componentIndex = {"uuid": {}, "id": {}}
+        config.groupIndex = {}
+        config.user_list = []
+        config.userIndex = {"uuid": {}, "username": {}}
 
         c_exhibit.create_new_exhibit("unittest", None)
         config.current_exhibit = "unittest"
@@ -32,6 +64,17 @@ class TestHelperMethods(unittest.TestCase):
         if os.path.exists(test_path):
             os.remove(test_path)
 
+        # Cancel any schedule timers left on the shared timer queue
+        for timer, _ in config.schedule_timers.values():
+            timer.cancel()
+        for timer in [config.schedule_reload_timer, config.schedule_reboot_timer]:
+            if timer is not None:
+                timer.cancel()
+        config.schedule_timers = {}
+        config.schedule_queue = []
+        config.schedule_reload_timer = None
+        config.schedule_reboot_timer = None
+
     # constellation_exhibit tests
 
     def test_component_creation(self):
@@ -55,6 +98,88 @@ class TestHelperMethods(unittest.TestCase):
         self.assertEqual(c_exhibit.get_exhibit_component("Test ID"), test)
         self.assertEqual(c_exhibit.get_exhibit_component("Does Not Exist"), None)
 
+    def test_component_index(self):
+        test = c_exhibit.add_exhibit_component("Test ID", ["Test group"])
+        self.assertEqual(c_exhibit.get_exhibit_component(component_uuid=test.uuid), test)
+
+        test.id = "Renamed ID"
+        self.assertEqual(c_exhibit.get_exhibit_component(component_id="Renamed ID"), test)
+        self.assertEqual(c_exhibit.get_exhibit_component(component_id="Test ID"), None)
+
+        test.remove()
+        self.assertEqual(c_exhibit.get_exhibit_component(component_uuid=test.uuid), None)
+        self.assertEqual(c_exhibit.get_exhibit_component(component_id="Renamed ID"), None)
+
+    def test_group_index(self):
+        test = c_exhibit.add_exhibit_component("Test ID", ["group 1"])
+        test2 = c_exhibit.add_exhibit_component("Test ID 2", ["group 1", "group 2"])
+        self.assertEqual(c_exhibit.get_group_components("group 1"), [test, test2])
+
+        test.groups = ["group 2"]
+        self.assertEqual(c_exhibit.get_group_components("group 1"), [test2])
+        self.assertEqual(c_exhibit.get_group_components("group 2"), [test2, test])
+
+        test2.remove()
+        self.assertEqual(c_exhibit.get_group_components("group 1"), [])
+        self.assertEqual(c_exhibit.get_group_components("group 2"), [test])
+        test.remove()
+
+    def test_command_components(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.settimeout(2)
+
+        wol = c_exhibit.add_wake_on_LAN_device("WOL ID", ["Test group"], "00:11:22:33:44:55")
+        wol.WOL_broadcast_address, wol.WOL_port = listener.getsockname()
+        test = c_exhibit.add_exhibit_component("Test ID", ["Test group"])
+        static = c_exhibit.add_exhibit_component("Static ID", ["Test group"], category="static")
+
+        results = c_exhibit.command_components([wol, test, static], "power_on")
+        self.assertEqual(results[wol.uuid]["result"], "sent")
+        self.assertEqual(results[test.uuid]["result"], "queued")
+        self.assertEqual(results[static.uuid]["result"], "skipped")
+        self.assertEqual(test.config["commands"], ["power_on"])
+        self.assertEqual(listener.recv(1024), b"\xff" * 6 + bytes.fromhex("001122334455") * 16)
+
+        listener.close()
+        wol.remove()
+
+    def test_send_helper_command(self):
+        received = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                received.append(self.path)
+                self.send_response(200 if self.path == "/restart" else 404)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        test = c_exhibit.add_exhibit_component("Test ID", ["Test group"])
+        test.helperAddress = f"127.0.0.1:{server.server_address[1]}"
+        self.assertEqual(test.send_helper_command("restart"), "sent")
+        self.assertEqual(received, ["/restart"])
+        self.assertTrue(test.send_helper_command("unknown").startswith("error"))
+
+        server.shutdown()
+        server.server_close()
+        retries = config.helper_command_retries
+        config.helper_command_retries = 0
+        self.assertTrue(test.send_helper_command("restart").startswith("error"))
+        config.helper_command_retries = retries
+
+    def test_projector_creation(self):
+        start = time.monotonic()
+        projector = c_exhibit.add_projector("Projector ID", ["Test group"], "10.255.255.1")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(projector.state["status"], "PROBING")
+        self.assertEqual(projector.polling_policy.is_due(time.monotonic()), True)
+        projector.remove()
+
     def test_update_synchronization_list(self):
         c_exhibit.update_synchronization_list("ID 1", ["ID 2", "ID 3"])
         self.assertEqual(config.synchronizationList[0]["ids"], ["ID 1", "ID 2", "ID 3"])
@@ -121,8 +246,301 @@ class TestHelperMethods(unittest.TestCase):
         c_issues.remove_issue("12345")
         self.assertEqual(len(config.issueList), 0)
 
+    # constellation_schedule
+
+    def test_queue_json_schedule(self):
+        now = datetime.datetime.now()
+        seconds = int((now - datetime.datetime.combine(now.date(), datetime.time.min)).total_seconds())
+        if seconds > 86400 - 120:
+            self.skipTest("Too close to midnight to queue events for today")
+        first, second = seconds + 60, seconds + 61
+
+        schedule = {
+            "a": {"time": "", "action": "refresh", "target": None, "value": None, "time_in_seconds": first},
+            "b": {"time": "", "action": "refresh", "target": None, "value": None, "time_in_seconds": second},
+            "c": {"time": "", "action": "note", "target": None, "value": "A note", "time_in_seconds": second}
+        }
+        c_sched.queue_json_schedule(schedule)
+        self.assertEqual(sorted(config.schedule_timers.keys()), ["a", "b"])
+        self.assertEqual(config.json_next_event, [schedule["a"]])
+        self.assertEqual(c_sched.get_queued_events(first, second), [schedule["a"], schedule["b"]])
+        self.assertEqual(c_sched.get_queued_events(second, second + 1), [schedule["b"]])
+
+        # Unchanged events keep their timers
+        timer_b = config.schedule_timers["b"][0]
+        del schedule["a"]
+        c_sched.queue_json_schedule(schedule)
+        self.assertEqual(list(config.schedule_timers.keys()), ["b"])
+        self.assertIs(config.schedule_timers["b"][0], timer_b)
+        self.assertEqual(config.json_next_event, [schedule["b"]])
+
+        c_sched.queue_json_schedule({})
+        self.assertEqual(config.schedule_timers, {})
+        self.assertEqual(timer_b.cancelled, True)
+
+    def test_retrieve_json_schedule_cache(self):
+        with temp_app_path("schedules"):
+            today = datetime.date.today().strftime("%A").lower() + ".json"
+            today_path = c_tools.get_path(["schedules", today], user_file=True)
+            c_tools.write_json({"a": {"time": "12:00 AM", "action": "refresh"}}, today_path)
+            tomorrow = (datetime.date.today() + datetime.timedelta(days=1)).isoformat() + ".json"
+            tomorrow_path = c_tools.get_path(["schedules", tomorrow], user_file=True)
+            c_tools.write_json({}, tomorrow_path)
+            config.json_schedule_list = []
+            config.json_schedule_sources = {}
+            config.schedule_file_cache = {}
+
+            c_sched.retrieve_json_schedule()
+            self.assertEqual(sorted(config.schedule_file_cache.keys()), sorted([today, tomorrow]))
+            self.assertEqual(config.json_schedule_list[1]["source"], "date-specific")
+
+            # Editing a file outside Constellation invalidates its cached copy
+            c_tools.write_json({"b": {"time": "12:00 AM", "action": "refresh"}}, today_path)
+            stat = os.stat(today_path)
+            os.utime(today_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            c_sched.retrieve_json_schedule()
+            self.assertEqual(list(config.json_schedule_list[0]["schedule"].keys()), ["b"])
+            self.assertEqual(config.schedule_file_cache[today][0], stat.st_mtime_ns + 1_000_000_000)
+
+            # A deleted file is dropped from the cache and its days fall back to the weekday schedule
+            os.remove(tomorrow_path)
+            c_sched.retrieve_json_schedule()
+            self.assertNotIn(tomorrow, config.schedule_file_cache)
+            self.assertNotEqual(config.json_schedule_list[1]["source"], "date-specific")
+
+    def test_update_json_schedule(self):
+        with temp_app_path("schedules"):
+            today = datetime.date.today().strftime("%A").lower() + ".json"
+            c_tools.write_json({}, c_tools.get_path(["schedules", today], user_file=True))
+            config.json_schedule_list = []
+            config.json_schedule_sources = {}
+            config.schedule_file_cache = {}
+            c_sched.retrieve_json_schedule()
+
+            # Editing a schedule in use updates the upcoming days in place, with a single notification
+            version = config.section_versions["schedule"]
+            c_sched.update_json_schedule(today, {"a": {"time": "12:00 AM", "action": "refresh"}})
+            self.assertEqual(config.section_versions["schedule"], version + 1)
+            self.assertEqual(list(config.json_schedule_list[0]["schedule"].keys()), ["a"])
+            self.assertEqual(config.json_schedule_list[7]["schedule"], config.json_schedule_list[0]["schedule"])
+
+            # A rebuild reuses the edited day without rereading the file
+            day = config.json_schedule_list[0]
+            c_sched.retrieve_json_schedule()
+            self.assertIs(config.json_schedule_list[0], day)
+
+            c_sched.delete_json_schedule_event(today, "a")
+            self.assertEqual(config.section_versions["schedule"], version + 2)
+            self.assertEqual(config.json_schedule_list[0]["schedule"], {})
+
+    def test_normalize_schedule(self):
+        schedule = {
+            "late": {"time": "5 PM", "action": "power_off"},
+            "early": {"time": "9:30 AM", "action": "power_on", "target": "__all", "value": None}
+        }
+        normalized = c_sched.normalize_schedule(schedule)
+        self.assertEqual(list(normalized.keys()), ["early", "late"])
+        self.assertEqual(normalized["early"]["time_in_seconds"], 34200)
+        self.assertEqual(normalized["late"]["target"], None)
+        # The day schedules made by check_file_structure() are empty lists
+        self.assertEqual(c_sched.normalize_schedule([]), {})
+
+    # projector_control
+
+    def test_pjlink_client(self):
+
+        async def handle_connection(reader, writer):
+            # A minimal PJLink projector with no password
+            responses = {"INF1": "EPSON", "INF2": "EB-L1", "POWR": "1", "LAMP": "1200 1", "ERST": "002000"}
+            writer.write(b"PJLINK 0\r")
+            while True:
+                try:
+                    line = (await reader.readuntil(b"\r")).decode()
+                except asyncio.IncompleteReadError:
+                    break
+                body = line[2:6]
+                writer.write(f"%1{body}={responses.get(body, 'ERR1')}\r".encode())
+            writer.close()
+
+        async def run_client():
+            server = await asyncio.start_server(handle_connection, "127.0.0.1", 0)
+            client = projector_control.PJLinkClient("127.0.0.1", port=server.sockets[0].getsockname()[1])
+            status = await client.get_status()
+            inputs = await client.send_command("get_inputs")
+            client.close()
+            await asyncio.sleep(0.01)  # Let the server see the connection close
+            server.close()
+            return status, inputs
+
+        status, inputs = asyncio.run(run_client())
+        self.assertEqual(status["model"], "EPSON EB-L1")
+        self.assertEqual(status["power_state"], "on")
+        self.assertEqual(status["lamp_status"], [(1200, True)])
+        self.assertEqual(status["error_status"]["temperature"], "error")
+        self.assertEqual(inputs, None)
+
+    def test_polling_policy(self):
+        policy = component_helpers.PollingPolicy(lambda: 5, lambda: 30)
+        for _ in range(policy.fast_poll_count):
+            policy.record_poll(False)
+        self.assertEqual(policy.interval, 5)
+
+        for _ in range(5):
+            policy.record_poll(False)
+        self.assertEqual(policy.interval, 30)
+
+        policy.record_poll(True)
+        self.assertEqual(policy.interval, 5)
+
+        for _ in range(policy.fast_poll_count + 2):
+            policy.record_poll(False)
+        self.assertGreater(policy.interval, 5)
+        policy.reset()
+        self.assertEqual(policy.interval, 5)
+        self.assertTrue(policy.is_due(time.monotonic() + 5))
+
     # constellation_tools
 
+    def test_timer_queue(self):
+        queue = c_tools.TimerQueue("Test timers")
+        results = []
+        done = threading.Event()
+
+        queue.call_later(0.05, results.append, "second")
+        queue.call_later(0.01, results.append, "first")
+        cancelled = queue.call_later(0.02, results.append, "cancelled")
+        queue.call_later(0.1, done.set)
+        cancelled.cancel()
+
+        self.assertEqual(done.wait(2), True)
+        self.assertEqual(results, ["first", "second"])
+        self.assertEqual(len(queue), 0)
+
+        # Cancelling a handle from its own callback does nothing
+        done.clear()
+        handles = []
+        handles.append(queue.call_later(0.01, lambda: (handles[0].cancel(), done.set())))
+        self.assertEqual(done.wait(2), True)
+        self.assertEqual(handles[0].cancelled, False)
+        self.assertEqual(len(queue), 0)
+
+    def test_write_behind_queue(self):
+        queue = c_tools.WriteBehindQueue("Test writer", 60)
+        test_path = c_tools.get_path(["unittest_file.txt"], user_file=True)
+
+        queue.schedule(test_path, lambda: {"version": 1})
+        queue.schedule(test_path, lambda: {"version": 2})
+        self.assertEqual(len(queue), 1)
+
+        queue.flush()
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(c_tools.load_json(test_path), {"version": 2})
+
+        queue.schedule(test_path, lambda: {"version": 3})
+        queue.discard(test_path)
+        queue.flush()
+        self.assertEqual(c_tools.load_json(test_path), {"version": 2})
+
+        # A failed write is kept for the next flush
+        with tempfile.TemporaryDirectory() as directory:
+            missing_path = os.path.join(directory, "missing", "test.json")
+            queue.schedule(missing_path, lambda: {"version": 4})
+            queue.flush()
+            self.assertEqual(len(queue), 1)
+            self.assertIsNotNone(queue.timer)
+            os.mkdir(os.path.join(directory, "missing"))
+            queue.flush()
+            self.assertEqual(len(queue), 0)
+            self.assertEqual(c_tools.load_json(missing_path), {"version": 4})
+
+            # A file that keeps failing is dropped after max_attempts tries
+            missing_path = os.path.join(directory, "still_missing", "test.json")
+            queue.schedule(missing_path, lambda: {"version": 5})
+            for _ in range(queue.max_attempts - 1):
+                queue.flush()
+                self.assertEqual(len(queue), 1)
+            queue.flush()
+            self.assertEqual(len(queue), 0)
+            self.assertIsNone(queue.timer)
+            self.assertEqual(queue.failures, {})
+
+    def test_write_behind_queue_timer(self):
+        queue = c_tools.WriteBehindQueue("Test writer", 0.01)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.json")
+            queue.schedule(path, lambda: {"version": 1})
+            fired = queue.timer
+
+            # The timer's own flush clears it without cancelling it, and a new write starts a new timer
+            for _ in range(200):
+                if os.path.exists(path):
+                    break
+                time.sleep(0.01)
+            self.assertEqual(c_tools.load_json(path), {"version": 1})
+            self.assertEqual(fired.cancelled, False)
+            self.assertIsNone(queue.timer)
+            queue.schedule(path, lambda: {"version": 2})
+            self.assertIsNotNone(queue.timer)
+            queue.flush()
+            self.assertEqual(c_tools.load_json(path), {"version": 2})
+
+    def test_write_text_atomic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.json")
+            c_tools.write_text_atomic("{}", path)
+            umask = os.umask(0)
+            os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+
+            os.chmod(path, 0o640)
+            c_tools.write_text_atomic("[]", path)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(directory), ["test.json"])
+
+    def test_command_executor(self):
+        executor = c_tools.CommandExecutor("Test commands", lambda: 2)
+        results = []
+        started = threading.Event()
+        done = threading.Event()
+
+        async def command(name):
+            if name == "first":
+                started.set()
+                await asyncio.sleep(0.05)
+            results.append(name)
+            if name == "done":
+                done.set()
+
+        executor.submit("projector", "power_on", lambda: command("first"), "power")
+        self.assertEqual(started.wait(2), True)
+        executor.submit("projector", "power_on", lambda: command("power_on"), "power")
+        executor.submit("projector", "power_off", lambda: command("power_off"), "power")
+        executor.submit("projector", "done", lambda: command("done"))
+        self.assertEqual(done.wait(2), True)
+
+        self.assertEqual(results, ["first", "power_off", "done"])
+        self.assertEqual(len(executor), 0)
+        self.assertEqual(executor.get_metrics()["commands"]["power_on"]["count"], 1)
+
+    def test_notify_update(self):
+        versions = dict(config.section_versions)
+
+        c_tools.notify_update("issues")
+        self.assertEqual(config.section_versions["issues"], versions["issues"] + 1)
+        self.assertEqual(config.section_versions["components"], versions["components"])
+
+        c_tools.notify_update()
+        for section in config.update_sections:
+            self.assertGreater(config.section_versions[section], versions[section])
+
+        # Changes within one clock tick still wake waiters
+        sequence = config.update_sequence
+        with unittest.mock.patch("time.time", return_value=1.0):
+            c_tools.notify_update("issues")
+            c_tools.notify_update("issues")
+        self.assertEqual(config.update_sequence, sequence + 2)
+        asyncio.run(asyncio.wait_for(c_tools.wait_for_update(sequence + 1), 1))
+
     def test_delete_file(self):
         test_path = c_tools.get_path(["unittest_file.txt"], user_file=True)
         response = c_tools.delete_file(test_path)
@@ -133,6 +551,103 @@ class TestHelperMethods(unittest.TestCase):
         response = c_tools.delete_file(bad_path)
         self.assertEqual(response["success"], False)
 
+    # constellation_users
+
+    def test_token_cache(self):
+        config.encryption_key = Fernet.generate_key()
+        user = c_users.User("tester", "Tester", "")
+        c_users.register_user(user)
+
+        token = c_users.encrypt_token(user.uuid)
+        self.assertEqual(c_users.authenticate_user(token=token), (True, user.uuid))
+        self.assertEqual(c_users.get_cached_token(token), user.uuid)
+
+        c_users.invalidate_user_tokens(user.uuid)
+        self.assertEqual(c_users.get_cached_token(token), None)
+
+        # Changing the key invalidates existing tokens
+        c_users.authenticate_user(token=token)
+        config.encryption_key = Fernet.generate_key()
+        self.assertEqual(c_users.authenticate_user(token=token), (False, ""))
+        self.assertEqual(c_users.get_cached_token(token), None)
+
+        config.encryption_key = None
+
+    def test_check_permission(self):
+        user = c_users.User("tester", "Tester", "", {
+            "analytics": "view",
+            "components": {"edit": ["group 1"], "edit_content": ["group 2"], "view": ["group 3"]},
+            "users": "edit"
+        })
+        self.assertEqual(user.check_permission("analytics", "view"), True)
+        self.assertEqual(user.check_permission("analytics", "edit"), False)
+        self.assertEqual(user.check_permission("users", "view"), True)
+        self.assertEqual(user.check_permission("settings", "view"), False)
+        self.assertEqual(user.check_permission("components", "edit", groups=["group 2", "group 1"]), True)
+        self.assertEqual(user.check_permission("components", "edit", groups=["group 2"]), False)
+        self.assertEqual(user.check_permission("components", "edit_content", groups=["group 2"]), True)
+        self.assertEqual(user.check_permission("components", "view", groups=["group 3"]), True)
+        self.assertEqual(user.check_permission("components", "view"), False)
+
+        test = c_exhibit.add_exhibit_component("Test ID", ["group 1"])
+        test2 = c_exhibit.add_exhibit_component("Test ID 2", ["group 4"])
+        self.assertEqual(user.filter_components([test, test2]), [test])
+        self.assertEqual(user.filter_groups(["group 4", "group 3", "group 2"], "edit_content"), ["group 2"])
+
+        # Replacing the permissions recompiles them
+        user.permissions = {"components": {"edit": [], "edit_content": [], "view": ["__all"]}}
+        self.assertEqual(user.filter_components([test, test2]), [test, test2])
+        self.assertEqual(user.check_permission("components", "edit", groups=["group 1"]), False)
+        self.assertEqual(user.check_permission("users", "view"), False)
+        test.remove()
+        test2.remove()
+
+    def test_user_registry(self):
+        with temp_app_path("configuration"):
+            success, user_dict = c_users.create_user("Tester", "Tester", "", password_hash="hash")
+            self.assertEqual(success, True)
+            user = c_users.get_user(username="tester")
+            self.assertIs(c_users.get_user(uuid_str=user_dict["uuid"]), user)
+            self.assertEqual(c_users.check_username_available("TESTER"), False)
+            self.assertEqual(c_users.create_user("tester", "Tester", "", password_hash="hash"), (False, {}))
+
+            user.username = "Renamed"
+            self.assertIs(c_users.get_user(username="renamed"), user)
+            self.assertEqual(c_users.get_user(username="tester"), None)
+            self.assertEqual(c_users.check_username_available("tester"), True)
+
+            # Activity is kept in memory until the next flush
+            c_tools.write_behind_queue.flush()
+            user.last_activity = "2000-01-01T00:00:00"
+            user.check_permission("analytics", "view")
+            self.assertEqual(config.user_activity_dirty, True)
+            timer = config.user_activity_timer
+            c_users.flush_user_activity()
+            c_tools.write_behind_queue.flush()
+            self.assertEqual(config.user_activity_dirty, False)
+            # Flushing directly doesn't start another timer
+            self.assertIs(config.user_activity_timer, timer)
+
+            last_activity = user.last_activity
+            c_users.load_users()
+            self.assertEqual(c_users.get_user(username="renamed").last_activity, last_activity)
+
+    def test_get_admin(self):
+        self.addCleanup(c_users.shutdown_password_pool)
+        self.addCleanup(setattr, config, "admin_user", None)
+        with temp_app_path("configuration"):
+            c_users.create_root_admin("first")
+            admin = c_users.get_user(username="admin")
+            config.user_activity_dirty = False
+            admin.update_last_activity()
+            self.assertEqual(config.user_activity_dirty, False)
+            self.assertIs(c_users.get_user(uuid_str="admin"), admin)
+            self.assertEqual(admin.authenticate("first"), True)
+
+            c_users.create_root_admin("second")
+            self.assertIs(c_users.get_user(username="admin"), admin)
+            self.assertEqual(admin.authenticate("second"), True)
+
     # constellation_tracker
     def test_JSON_list_to_CSV(self):
         simple_list = [{"item1": 1, "item2": 2}]
@@ -152,3 +667,51 @@ class TestHelperMethods(unittest.TestCase):
                 {"name": "Doug", "friends": ["Jerry", "Joanna", "Tony", "Steve", "Katie"]}]
         self.assertEqual(sorted(c_track.get_unique_values(test, "friends")),
                          sorted(['Joanna', 'Katie', 'Mike', 'Tony', 'Doug', 'Jerry', 'Steve']))
+
+    # control_server
+
+    def test_diff_component_dicts(self):
+        old = {"a": {"id": "A", "status": "ONLINE", "old_field": 1},
+               "b": {"id": "B", "status": "ONLINE"}}
+        new = {"a": {"id": "A", "status": "OFFLINE", "new_field": 2},
+               "c": {"id": "C", "status": "ONLINE"}}
+        self.assertEqual(control_server.diff_component_dicts(old, new), [
+            {"op": "remove", "path": "/b"},
+            {"op": "replace", "path": "/a/status", "value": "OFFLINE"},
+            {"op": "add", "path": "/a/new_field", "value": 2},
+            {"op": "remove", "path": "/a/old_field"},
+            {"op": "add", "path": "/c", "value": {"id": "C", "status": "ONLINE"}}
+        ])
+        self.assertEqual(control_server.diff_component_dicts(new, new), [])
+
+    def test_join_json_sections(self):
+        data = control_server.join_json_sections(3, {"gallery": '{"name": "Test"}', "issues": "[]"})
+        self.assertEqual(c_tools.json_loads(data), {"version": 3, "gallery": {"name": "Test"}, "issues": []})
+
+    def test_get_webpage_update_events(self):
+        # Deltas are sent when the client is one or more versions behind
+        control_server.refresh_webpage_update()
+        start_version = config.webpage_update_version
+        test = c_exhibit.add_exhibit_component("Test ID", ["Test group"])
+        c_tools.notify_update("components")
+        _, events = control_server.get_webpage_update_events(start_version)
+        self.assertEqual([(event, version) for event, version, _ in events], [("delta", start_version + 1)])
+        patch = c_tools.json_loads(events[0][2])["components_patch"]
+        self.assertEqual([(op["op"], op["path"]) for op in patch], [("add", "/" + test.uuid)])
+
+        # A client that is up to date gets nothing
+        self.assertEqual(control_server.get_webpage_update_events(start_version + 1)[1], [])
+
+        # A new client, or one further behind than the stored deltas, gets the full snapshot
+        test.id = "Renamed ID"
+        c_tools.notify_update("components")
+        control_server.refresh_webpage_update()
+        deltas = config.webpage_update_deltas
+        config.webpage_update_deltas = collections.deque([deltas[-1]], maxlen=deltas.maxlen)
+        for since_version in [0, start_version]:
+            _, events = control_server.get_webpage_update_events(since_version)
+            self.assertEqual([(event, version) for event, version, _ in events], [("update", start_version + 2)])
+            snapshot = c_tools.json_loads(events[0][2])
+            self.assertIn("Renamed ID", [component["id"] for component in snapshot["components"]])
+        config.webpage_update_deltas = deltas
+        test.remove()
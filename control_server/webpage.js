@@ -435,41 +435,130 @@ function parseUpdate (update) {
   }
 
   if ('components' in update) {
-    let numComps = 0
-    let numOnline = 0
-    let numStatic = 0
-
+    // A full snapshot replaces everything we know about the components
+    constConfig.componentStates = {}
+    update.components.forEach((component) => {
+      constConfig.componentStates[component.uuid] = component
+    })
     constExhibit.checkForRemovedComponents(update.components)
     update.components.forEach((component) => {
-      numComps += 1
-      if ((component.status === constConfig.STATUS.ONLINE.name) || (component.status === constConfig.STATUS.STANDBY.name) || (component.status === constConfig.STATUS['SYSTEM ON'].name) || (component.status === constConfig.STATUS.STATIC.name)) {
-        numOnline += 1
-      }
-      if (component.status === constConfig.STATUS.STATIC.name) {
-        numStatic += 1
-      }
       constExhibit.updateComponentFromServer(component)
     })
+    updateComponentSummary()
+  }
+
+  if ('components_patch' in update) {
+    applyComponentPatch(update.components_patch)
+  }
+}
+
+function applyComponentPatch (patch) {
+  // Apply a list of JSON Patch operations to the stored component states and
+  // update only the components that changed.
+  // Paths have the form /<uuid> or /<uuid>/<field>
+
+  if (patch.length === 0) return
 
-    // Set the favicon to reflect the aggregate status
-    if (numOnline === numComps) {
-      $("link[rel='icon']").attr('href', 'icon/green.ico')
-    } else if (numOnline === 0) {
-      $("link[rel='icon']").attr('href', 'icon/red.ico')
+  const changed = new Set()
+  let checkRemoved = false
+
+  patch.forEach((operation) => {
+    const [uuid, key] = operation.path.split('/').slice(1)
+    if (key == null) {
+      if (operation.op === 'remove') {
+        delete constConfig.componentStates[uuid]
+        checkRemoved = true
+      } else {
+        constConfig.componentStates[uuid] = operation.value
+        changed.add(uuid)
+      }
     } else {
-      $("link[rel='icon']").attr('href', 'icon/yellow.ico')
+      const state = constConfig.componentStates[uuid]
+      if (state == null) return
+      if (operation.op === 'remove') {
+        delete state[key]
+      } else {
+        state[key] = operation.value
+      }
+      // Components are matched by id, so a new id leaves the old one behind
+      if (key === 'id') checkRemoved = true
+      changed.add(uuid)
     }
-    // If there are no static components, hide the "SHow STATIC" button
-    if (numStatic === 0) {
-      $('#componentsTabSettingsShowStatic').parent().parent().hide()
-      document.getElementById('componentsTabSettingsShowStaticDivider').parentElement.style.display = 'none'
-    } else {
-      $('#componentsTabSettingsShowStatic').parent().parent().show()
-      document.getElementById('componentsTabSettingsShowStaticDivider').parentElement.style.display = 'block'
+  })
+
+  if (checkRemoved) {
+    constExhibit.checkForRemovedComponents(Object.values(constConfig.componentStates))
+  }
+  changed.forEach((uuid) => {
+    if (uuid in constConfig.componentStates) {
+      constExhibit.updateComponentFromServer(constConfig.componentStates[uuid])
     }
+  })
+  updateComponentSummary()
+}
+
+function updateComponentSummary () {
+  // Update the favicon and the STATIC button to reflect the stored component states.
+
+  let numComps = 0
+  let numOnline = 0
+  let numStatic = 0
+
+  Object.values(constConfig.componentStates).forEach((component) => {
+    numComps += 1
+    if ((component.status === constConfig.STATUS.ONLINE.name) || (component.status === constConfig.STATUS.STANDBY.name) || (component.status === constConfig.STATUS['SYSTEM ON'].name) || (component.status === constConfig.STATUS.STATIC.name)) {
+      numOnline += 1
+    }
+    if (component.status === constConfig.STATUS.STATIC.name) {
+      numStatic += 1
+    }
+  })
+
+  // Set the favicon to reflect the aggregate status
+  if (numOnline === numComps) {
+    $("link[rel='icon']").attr('href', 'icon/green.ico')
+  } else if (numOnline === 0) {
+    $("link[rel='icon']").attr('href', 'icon/red.ico')
+  } else {
+    $("link[rel='icon']").attr('href', 'icon/yellow.ico')
+  }
+  // If there are no static components, hide the "SHow STATIC" button
+  if (numStatic === 0) {
+    $('#componentsTabSettingsShowStatic').parent().parent().hide()
+    document.getElementById('componentsTabSettingsShowStaticDivider').parentElement.style.display = 'none'
+  } else {
+    $('#componentsTabSettingsShowStatic').parent().parent().show()
+    document.getElementById('componentsTabSettingsShowStaticDivider').parentElement.style.display = 'block'
   }
 }
 
+function subscribeToUpdates () {
+  // Open a server-sent event stream. The server sends a full snapshot on
+  // connect and then deltas, each one version after the last.
+
+  const eventSource = new EventSource(constConfig.serverAddress + '/system/updateStream')
+  eventSource.addEventListener('update', function (event) {
+    const update = JSON.parse(event.data)
+    constConfig.updateVersion = update.version
+    parseUpdate(update)
+  })
+  eventSource.addEventListener('delta', function (event) {
+    const update = JSON.parse(event.data)
+    if (update.version !== constConfig.updateVersion + 1) {
+      // We missed a delta, so reconnect to receive a fresh snapshot
+      eventSource.close()
+      subscribeToUpdates()
+      return
+    }
+    constConfig.updateVersion = update.version
+    parseUpdate(update)
+  })
+  eventSource.addEventListener('end', function (event) {
+    console.log('Handling end....')
+    eventSource.close()
+  })
+}
+
 function populateHelpTab () {
   // Ask the server to send the latest README, convert the Markdown to
   // HTML, and add it to the Help tab.
@@ -1262,13 +1351,5 @@ constTracker.getAvailableDefinitions(populateTrackerTemplateSelect)
 constUsers.authenticateUser()
   .then(() => {
     // Subscribe to updates from the control server once we're logged in (or not)
-    const eventSource = new EventSource(constConfig.serverAddress + '/system/updateStream')
-    eventSource.addEventListener('update', function (event) {
-      const update = JSON.parse(event.data)
-      parseUpdate(update)
-    })
-    eventSource.addEventListener('end', function (event) {
-      console.log('Handling end....')
-      eventSource.close()
-    })
+    subscribeToUpdates()
   })